@@ -3,7 +3,9 @@ const Analysis = require('../models/Analysis');
 
 exports.analyzeVideo = async (req, res) => {
   try {
-    if (!req.file) {
+    const file = req.files && req.files.file ? req.files.file[0] : null;
+    const landmarks = req.files && req.files.landmarks ? req.files.landmarks[0] : null;
+    if (!file && !landmarks) {
       return res.status(400).json({ success: false, error: 'No file uploaded' });
     }
 
@@ -13,7 +15,7 @@ exports.analyzeVideo = async (req, res) => {
     }
 
     const userId = req.user && req.user.id ? req.user.id : null;
-    const result = await analysisService.processAnalysis(req.file, sessionId, userId);
+    const result = await analysisService.processAnalysis(file, sessionId, userId, landmarks);
     
     res.json({
       success: true,
@@ -57,3 +59,23 @@ exports.getAnalysisDetail = async (req, res) => {
   }
 };
 
+
+// Render video overlay khi người dùng mở video (chế độ DEFER_RENDER)
+exports.renderAnalysisVideo = async (req, res) => {
+  try {
+    const analysis = await analysisService.renderAnalysisVideo(req.params.id);
+
+    if (!analysis) {
+      return res.status(404).json({ success: false, error: 'Không tìm thấy video này' });
+    }
+
+    res.json({
+      success: true,
+      data: analysis
+    });
+
+  } catch (error) {
+    console.error("Render Video Error:", error);
+    res.status(500).json({ success: false, error: 'Render failed', details: error.message });
+  }
+};
@@ -26,6 +26,13 @@ const AnalysisSchema = new mongoose.Schema({
     type: String, 
     enum: ['pending', 'processing', 'completed', 'failed'], 
     default: 'pending' 
+  },
+
+  // Trạng thái video overlay (DEFER_RENDER=true: chỉ render khi người dùng mở video)
+  renderStatus: {
+    type: String,
+    enum: ['pending', 'rendering', 'ready', 'failed'],
+    default: 'ready'
   }
 }, { timestamps: true });
 
@@ -4,8 +4,15 @@ const upload = require('../middleware/upload.middleware');
 const analyzeController = require('../controllers/analysis.controller');
 const authMiddleware = require('../middleware/auth.middleware');
 
-router.post('/', upload.single('file'), authMiddleware, analyzeController.analyzeVideo);
+// file: video; landmarks: landmark track từ client (.json/.npz), gửi kèm hoặc thay cho video
+router.post(
+    '/',
+    upload.fields([{ name: 'file', maxCount: 1 }, { name: 'landmarks', maxCount: 1 }]),
+    authMiddleware,
+    analyzeController.analyzeVideo
+);
 router.get('/:id', authMiddleware, analyzeController.getAnalysisDetail);
+router.post('/:id/render', authMiddleware, analyzeController.renderAnalysisVideo);
 
 
 module.exports = router;
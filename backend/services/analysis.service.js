@@ -1,6 +1,7 @@
 const path = require('path');
 const fs = require('fs');
 const { runPythonScript } = require('../utils/pythonRunner');
+const { runWorkerJob } = require('../utils/pythonWorker');
 const aiService = require('./ai.service');
 const Analysis = require('../models/Analysis');
 const sessionService = require('./session.service');
@@ -19,20 +20,58 @@ const calculateExpFromBand = (band) => {
     return 0;
 };
 
-exports.processAnalysis = async (file, sessionId = null, userId = null) => {
+// Chạy một job Python: mode = 'analyze' | 'metrics' (chưa render video) | 'render'
+// | 'landmarks' (chỉ có landmark track từ client, không có video).
+// landmarks: đường dẫn landmark track, dùng thay cho bước trích xuất pose trên server.
+const runAnalysisJob = (input, output, mode, landmarks = null) => {
+    if (process.env.PYTHON_WORKER === 'false') {
+        const scriptPath = path.resolve(__dirname, '../services/process_video.py');
+        const trackFlags = landmarks ? ['--landmarks', landmarks] : [];
+        if (mode === 'landmarks') {
+            return runPythonScript(scriptPath, trackFlags);
+        }
+        const flags = { analyze: [], metrics: ['--metrics-only'], render: ['--render'] }[mode];
+        return runPythonScript(scriptPath, [...trackFlags, ...flags, input, output]);
+    }
+    if (mode === 'landmarks') {
+        return runWorkerJob({ landmarks, mode });
+    }
+    return runWorkerJob(landmarks ? { input, output, mode, landmarks } : { input, output, mode });
+};
+
+// Các job render đang chạy, theo analysisId (tránh render trùng khi mở video nhiều lần)
+const renderJobs = new Map();
+
+exports.processAnalysis = async (file, sessionId = null, userId = null, landmarksFile = null) => {
 
     // 1. Setup đường dẫn (Giữ nguyên)
-    const outputFilename = `processed-${Date.now()}-${file.filename}`;
+    // Không có video (chỉ có landmark track): không có video output.
+    const outputFilename = file ? `processed-${Date.now()}-${file.filename}` : null;
     const outputDir = path.resolve(__dirname, '../processed');
-    const outputPath = path.join(outputDir, outputFilename);
+    const outputPath = file ? path.join(outputDir, outputFilename) : null;
 
     if (!fs.existsSync(outputDir)) fs.mkdirSync(outputDir);
 
     // 2. Chạy Python
-    const scriptPath = path.resolve(__dirname, '../services/process_video.py');
-
+    // Mặc định dùng worker Python chạy lâu dài (model/landmarker đã nạp sẵn).
+    // Đặt PYTHON_WORKER=false để quay về chế độ mỗi upload một process.
+    // DEFER_RENDER=true: chỉ tính metrics, video overlay được render sau
+    // (renderAnalysisVideo) khi người dùng mở video.
+    // Có landmark track từ client: bỏ qua bước chạy MediaPipe trên server.
     // metrics nhận được: { band, swing_speed, arm_angle... } KHÔNG CÓ SCORE
-    let metrics = await runPythonScript(scriptPath, [file.path, outputPath]);
+    const deferRender = Boolean(file) && process.env.DEFER_RENDER === 'true';
+    const landmarksPath = landmarksFile ? landmarksFile.path : null;
+    let mode = deferRender ? 'metrics' : 'analyze';
+    if (!file) mode = 'landmarks';
+    let metrics;
+    try {
+        metrics = await runAnalysisJob(file ? file.path : null, outputPath, mode, landmarksPath);
+    } finally {
+        // Pose đã nằm trong kết quả (hoặc state render), không cần giữ track
+        if (landmarksPath) {
+            fs.unlink(landmarksPath, (err) => { if (err) console.error(err); });
+        }
+    }
 
     // 3. Xử lý bổ sung (Logic mới)
     // Nếu Python không trả score, ta tự tính score từ Band để lưu vào DB (nếu muốn hiện con số)
@@ -41,8 +80,10 @@ exports.processAnalysis = async (file, sessionId = null, userId = null) => {
         metrics.score = estimateScoreFromBand(metrics.band);
     }
 
-    // Xóa file temp
-    fs.unlink(file.path, (err) => { if (err) console.error(err); });
+    // Xóa file temp (giữ lại nếu video overlay còn chờ render)
+    if (file && !deferRender) {
+        fs.unlink(file.path, (err) => { if (err) console.error(err); });
+    }
 
     // 4. Gọi AI Advice
     // Truyền metrics đầy đủ (đã có thêm score giả lập) cho AI chém gió
@@ -52,12 +93,13 @@ exports.processAnalysis = async (file, sessionId = null, userId = null) => {
     const newAnalysis = new Analysis({
         session: sessionId,
         user: userId,
-        originalVideoUrl: file.path,
-        processedVideoUrl: `/processed/${outputFilename}`,
-        thumbnailUrl: `/processed/${outputFilename}`,
+        originalVideoUrl: file ? file.path : undefined,
+        processedVideoUrl: file ? `/processed/${outputFilename}` : undefined,
+        thumbnailUrl: file ? `/processed/${outputFilename}` : undefined,
         metrics: metrics, // Lưu metrics đã được bổ sung score
         aiAdvice: advice,
-        status: 'completed'
+        status: 'completed',
+        renderStatus: deferRender ? 'pending' : 'ready'
     });
 
     await newAnalysis.save();
@@ -87,3 +129,38 @@ exports.getAnalysisById = async (analysisId) => {
         .populate('session', 'title');
     return analysis;
 };
+
+
+// Render video overlay cho một analysis đã chạy ở chế độ DEFER_RENDER
+exports.renderAnalysisVideo = async (analysisId) => {
+    const analysis = await Analysis.findById(analysisId);
+    if (!analysis || analysis.renderStatus === 'ready') return analysis;
+
+    if (!renderJobs.has(analysisId)) {
+        const outputPath = path.join(
+            path.resolve(__dirname, '../processed'),
+            path.basename(analysis.processedVideoUrl)
+        );
+
+        const job = (async () => {
+            analysis.renderStatus = 'rendering';
+            await analysis.save();
+            try {
+                await runAnalysisJob(analysis.originalVideoUrl, outputPath, 'render');
+            } catch (err) {
+                analysis.renderStatus = 'failed';
+                await analysis.save();
+                throw err;
+            }
+
+            analysis.renderStatus = 'ready';
+            await analysis.save();
+            fs.unlink(analysis.originalVideoUrl, (err) => { if (err) console.error(err); });
+            return analysis;
+        })().finally(() => renderJobs.delete(analysisId));
+
+        renderJobs.set(analysisId, job);
+    }
+
+    return renderJobs.get(analysisId);
+};
@@ -0,0 +1,379 @@
+"""Build the training set from the labelled videos under DATA_ROOT.
+
+Usage:
+    python -m services.build_dataset [--data-root DIR] [--workers N]
+                                     [--augment N] [--rebuild] [--retry-failed]
+
+Videos are found under <env folder>/<band folder> (either order, any depth),
+using ENVIRONMENT_FOLDER_MAP and BAND_FOLDER_MAP. Each video is decoded,
+pose-tracked, cut to its swing window and turned into features in a process
+pool; every worker process keeps one landmarker for all of its videos. The
+parent writes the samples with FeatureEngineer.save_sample() and appends one
+line per video to a manifest, so an interrupted build resumes with the
+videos it has not finished yet. Once all videos are done it exports the
+splits, adds missingness-dropout copies of train samples, fits the scaler and
+writes the metadata.
+
+Samples go to the FeatureStore (or .npz files, see FEATURE_STORAGE) and are
+not normalised; readers apply the versioned scaler written at the end.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import services.config as config
+from pipeline.types import PoseSequence, QualityMetrics
+from services.feature_engineering import (
+    FeatureEngineer,
+    load_saved_sample,
+    load_scaler,
+)
+from services.pose_processing import PoseProcessor
+from services.video_processing import VideoProcessor
+
+MANIFEST_FILENAME = "build_manifest.jsonl"
+
+_worker_state: Optional[Tuple[VideoProcessor, PoseProcessor, FeatureEngineer]] = None
+
+
+def build_settings() -> Dict:
+    """Settings that change the samples; manifest entries built with other
+    settings are processed again."""
+    return {
+        "target_fps": config.TARGET_FPS,
+        "n_frames": config.N_FRAMES,
+        "pose_input_long_side": config.POSE_INPUT_LONG_SIDE,
+        "padding": config.PADDING_MARGIN_FRAMES,
+        "decoder": config.VIDEO_DECODER,
+        "pose_model": Path(config.POSE_MODEL_PATH).name,
+    }
+
+
+def find_labelled_videos(data_root: Path) -> Iterator[Tuple[Path, str, str]]:
+    """(video path, env, band) for every labelled video under data_root."""
+    for path in sorted(Path(data_root).rglob("*")):
+        if path.suffix.lower() not in config.VIDEO_EXTENSIONS or not path.is_file():
+            continue
+        parts = path.relative_to(data_root).parts[:-1]
+        env = next(
+            (
+                config.ENVIRONMENT_FOLDER_MAP[p]
+                for p in parts
+                if p in config.ENVIRONMENT_FOLDER_MAP
+            ),
+            None,
+        )
+        band = next(
+            (config.BAND_FOLDER_MAP[p] for p in parts if p in config.BAND_FOLDER_MAP),
+            None,
+        )
+        if env is None or band is None:
+            print(f"Skipping unlabelled video: {path}")
+            continue
+        yield path, env, band
+
+
+def video_id_for(path: Path, data_root: Path) -> str:
+    # Stems repeat across folders; the relative path keeps ids unique.
+    rel = path.relative_to(data_root).as_posix()
+    return f"{path.stem}_{hashlib.sha1(rel.encode()).hexdigest()[:8]}"
+
+
+def _init_worker() -> None:
+    global _worker_state
+    _worker_state = (
+        VideoProcessor(target_fps=config.TARGET_FPS),
+        PoseProcessor(),
+        FeatureEngineer(),
+    )
+
+
+def process_video_sample(video_path: str) -> Dict:
+    """Features of one video's swing window (runs in a worker process)."""
+    video_processor, pose_processor, feature_engineer = _worker_state
+    clip = video_processor.open_stream(
+        Path(video_path), long_side=config.POSE_INPUT_LONG_SIDE
+    )
+    sequence = pose_processor.extract_sequence(clip.iter_frames(), clip.fps)
+    if len(sequence.data) == 0:
+        raise RuntimeError("no frames after resampling")
+
+    window = video_processor.detect_swing_window(sequence)
+    # Same fallback as serving (SwingAnalyzer): too short a window -> whole clip.
+    start, end = window.start_frame, window.end_frame
+    if end - start < 10:
+        start, end = 0, len(sequence.data)
+    sliced = PoseSequence(
+        data=sequence.data[start:end],
+        frame_times=sequence.frame_times[start:end],
+        fps=sequence.fps,
+        interpolation_mask=sequence.interpolation_mask[start:end],
+        valid_mask=sequence.valid_mask[start:end],
+    )
+
+    processed, quality = pose_processor.prepare_sequence(sliced)
+    joint_features, global_features = feature_engineer.compute_features(processed)
+    return {
+        "joint_features": joint_features,
+        "global_features": global_features,
+        "interpolation_mask": processed.interpolation_mask,
+        "quality": quality,
+        "metadata": {
+            "swing_start": float(start),
+            "swing_end": float(end),
+            "window_confidence": float(window.confidence),
+            "num_frames": float(len(sequence.data)),
+            "original_fps": float(clip.original_fps),
+        },
+    }
+
+
+class DatasetBuilder:
+    def __init__(
+        self,
+        data_root: Path = config.DATA_ROOT,
+        workers: int = 0,
+        augment: int = 0,
+        start_method: str = config.PARALLEL_POSE_START_METHOD,
+    ) -> None:
+        self.data_root = Path(data_root)
+        self.workers = workers or os.cpu_count() or 1
+        self.augment = augment
+        self.start_method = start_method
+        self.feature_engineer = FeatureEngineer()
+        self.settings = build_settings()
+        self.manifest_path = (
+            config.OUTPUT_ROOT / config.FINAL_METADATA_SUBDIR / MANIFEST_FILENAME
+        )
+
+    # ------------------- MANIFEST -------------------
+    def load_manifest(self) -> Dict[str, Dict]:
+        """Latest entry per video from earlier (possibly interrupted) runs."""
+        entries: Dict[str, Dict] = {}
+        if not self.manifest_path.exists():
+            return entries
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line of an interrupted run
+                entries[entry["video"]] = entry
+        return entries
+
+    def _append_manifest(self, entry: Dict) -> None:
+        with open(self.manifest_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _is_done(self, entry: Optional[Dict], path: Path, retry_failed: bool) -> bool:
+        if entry is None or entry.get("settings") != self.settings:
+            return False
+        stat = path.stat()
+        if entry.get("size") != stat.st_size or entry.get("mtime") != stat.st_mtime:
+            return False
+        if entry["status"] == "failed":
+            return not retry_failed
+        return all(
+            self.feature_engineer.sample_exists(record) for record in entry["records"]
+        )
+
+    # ------------------- BUILD -------------------
+    def build(self, rebuild: bool = False, retry_failed: bool = False) -> int:
+        """Process every labelled video not already in the manifest, then
+        export splits, augmentations, scaler and metadata. Returns the number
+        of base samples."""
+        config.ensure_directories()
+        if rebuild:
+            if self.manifest_path.exists():
+                self.manifest_path.unlink()
+            if self.feature_engineer.storage == "store":
+                self.feature_engineer.feature_store.clear()
+        manifest = self.load_manifest()
+
+        pending = []
+        for path, env, band in find_labelled_videos(self.data_root):
+            rel = path.relative_to(self.data_root).as_posix()
+            entry = manifest.get(rel)
+            if self._is_done(entry, path, retry_failed):
+                self.feature_engineer.sample_records.extend(entry["records"])
+            else:
+                pending.append((path, rel, env, band))
+
+        done = len(self.feature_engineer.sample_records)
+        print(f"{done} video(s) already built, {len(pending)} to process")
+        if pending:
+            self._process(pending)
+
+        return self.finalize()
+
+    def _process(self, pending: List[Tuple[Path, str, str, str]]) -> None:
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(pending)),
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=_init_worker,
+        ) as pool:
+            futures = {
+                pool.submit(process_video_sample, str(path)): (path, rel, env, band)
+                for path, rel, env, band in pending
+            }
+            for i, future in enumerate(as_completed(futures), 1):
+                path, rel, env, band = futures[future]
+                stat = path.stat()
+                entry = {
+                    "video": rel,
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "settings": self.settings,
+                    "records": [],
+                }
+                try:
+                    sample = future.result()
+                    self.feature_engineer.save_sample(
+                        video_id=video_id_for(path, self.data_root),
+                        env=env,
+                        band=band,
+                        joint_features=sample["joint_features"],
+                        global_features=sample["global_features"],
+                        interpolation_mask=sample["interpolation_mask"],
+                        quality=sample["quality"],
+                        metadata=sample["metadata"],
+                    )
+                    entry["status"] = "ok"
+                    entry["records"] = [self.feature_engineer.sample_records[-1]]
+                    print(f"[{i}/{len(pending)}] {rel}")
+                except Exception as e:
+                    entry["status"] = "failed"
+                    entry["error"] = str(e)
+                    print(f"[{i}/{len(pending)}] {rel} failed: {e}")
+                self._append_manifest(entry)
+
+    def finalize(self) -> int:
+        fe = self.feature_engineer
+        base_samples = len(fe.sample_records)
+        if base_samples == 0:
+            print("No samples built.")
+            return 0
+
+        split_path = fe.export_splits()
+        print(f"Splits: {split_path}")
+
+        # After the split, so val/test videos never leak into train copies.
+        if self.augment > 0:
+            self._augment_train_samples()
+
+        used = fe.fit_scaler_from_saved_sequences(workers=self.workers)
+        fe.finalize_scaler()
+        print(f"Scaler {load_scaler().version} fitted on {used} sample(s)")
+
+        try:
+            print(f"Metadata: {fe.export_metadata()}")
+        except ImportError:
+            print("pandas not installed, skipping metadata CSV")
+        return base_samples
+
+    def _augment_train_samples(self) -> None:
+        """Add self.augment dropout copies per train sample.
+
+        Copies are seeded per base sample, so each one is the same in every
+        run. In the FeatureStore, copies already saved from the same base
+        features with the same settings are reused instead of appended again.
+        """
+        fe = self.feature_engineer
+        store = fe.feature_store if fe.storage == "store" else None
+        train_records = [r for r in fe.sample_records if r["split"] == "train"]
+        reused = 0
+        for record in train_records:
+            X_joint, X_global, interp_mask = load_saved_sample(record, store)
+            augmentation = {
+                "dropout_prob": float(config.AUGMENTATION_CONFIG["dropout_prob"]),
+                "seed": config.RANDOM_SEED,
+                "source": hashlib.sha1(
+                    np.ascontiguousarray(X_joint).tobytes()
+                ).hexdigest()[:12],
+            }
+            base_name = fe.sample_name(
+                record["video_id"], record["env"], record["band"]
+            )
+            seed_key = f"{config.RANDOM_SEED}:{base_name}".encode()
+            np.random.seed(int(hashlib.sha1(seed_key).hexdigest()[:8], 16))
+            if interp_mask is None:
+                interp_mask = np.zeros(X_joint.shape[:2], dtype=bool)
+            quality = QualityMetrics(
+                valid_ratio=record["valid_ratio"],
+                mean_visibility=record["mean_visibility"],
+                keypoint_visibility={},
+                longest_dropout=record["longest_dropout"],
+                low_quality=record["low_quality"],
+            )
+            for k in range(self.augment):
+                joint, global_ = fe.augment_missingness_dropout(X_joint, X_global)
+                name = fe.sample_name(
+                    record["video_id"], record["env"], record["band"], f"drop{k}"
+                )
+                existing = store.get(name) if store is not None else None
+                if (
+                    existing is not None
+                    and existing.get("augmentation") == augmentation
+                ):
+                    existing["split"] = "train"
+                    fe.sample_records.append(existing)
+                    reused += 1
+                    continue
+                fe.save_sample(
+                    video_id=record["video_id"],
+                    env=record["env"],
+                    band=record["band"],
+                    joint_features=joint,
+                    global_features=global_,
+                    interpolation_mask=interp_mask,
+                    quality=quality,
+                    metadata={},
+                    augmented_suffix=f"drop{k}",
+                    record_extra={"augmentation": augmentation},
+                )
+                fe.sample_records[-1]["split"] = "train"
+        print(
+            f"Augmented {len(train_records)} train sample(s) x{self.augment} "
+            f"({reused} copies already saved)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--data-root", default=str(config.DATA_ROOT))
+    parser.add_argument(
+        "--workers", type=int, default=0, help="processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--augment",
+        type=int,
+        default=0,
+        help="missingness-dropout copies per train sample",
+    )
+    parser.add_argument(
+        "--rebuild", action="store_true", help="ignore the manifest, start over"
+    )
+    parser.add_argument(
+        "--retry-failed", action="store_true", help="process failed videos again"
+    )
+    args = parser.parse_args()
+
+    builder = DatasetBuilder(Path(args.data_root), args.workers, args.augment)
+    count = builder.build(rebuild=args.rebuild, retry_failed=args.retry_failed)
+    print(f"Done: {count} sample(s)")
+
+
+if __name__ == "__main__":
+    main()
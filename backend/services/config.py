@@ -36,6 +36,125 @@ for p in candidate_pose_paths:
 else:
     POSE_MODEL_PATH = candidate_pose_paths[0]
 
+# Optional lite landmarker for the coarse pass of two-pass pose extraction.
+# Falls back to POSE_MODEL_PATH when no lite model is installed.
+candidate_pose_lite_paths = [
+    p.with_name("pose_landmarker_lite.task") for p in candidate_pose_paths
+]
+for p in candidate_pose_lite_paths:
+    if p.exists():
+        POSE_LITE_MODEL_PATH = p
+        break
+else:
+    POSE_LITE_MODEL_PATH = POSE_MODEL_PATH
+
+# Trained CORAL swing classifier checkpoint
+AI_MODEL_FILENAME = "coral_ordinal_model_20260102_001311.pth"
+AI_MODEL_PATH = MODELS_DIR / AI_MODEL_FILENAME
+# Serving-time model loading: a TorchScript export of the checkpoint is cached
+# in this folder next to the checkpoint, keyed by the checkpoint content hash.
+MODEL_CACHE_SUBDIR = ".model_cache"
+MODEL_USE_COMPILED_ARTIFACT: bool = True
+MODEL_WARMUP_RUNS: int = 2
+# Opt-in int8 dynamic quantization for CPU serving (see services/quantization.py
+# for the agreement check against the float model).
+MODEL_QUANTIZE_INT8: bool = False
+
+# Inference backend for the prediction step: "torch" or "onnx" (onnxruntime,
+# CPU). The ONNX export is cached in MODEL_CACHE_SUBDIR like the TorchScript one.
+INFERENCE_BACKEND = "torch"
+ONNX_OPSET: int = 17
+ONNX_INTRA_OP_THREADS: int = 0  # 0 = let onnxruntime decide
+
+# Worker mode (process_video --worker): jobs analysed concurrently, with model
+# inference gathered into micro-batches across those jobs.
+WORKER_CONCURRENCY: int = 4
+INFERENCE_MAX_BATCH_SIZE: int = 8
+INFERENCE_MAX_WAIT_MS: float = 20.0
+
+# Decode frames lazily (pose pass and overlay pass each re-decode the file)
+# instead of holding every full-resolution frame in memory.
+STREAMING_DECODE: bool = True
+
+# Long side (px) of the frames handed to the pose landmarker; it resizes to its
+# own small input anyway. Full resolution is only kept for the overlay. 0 = off.
+POSE_INPUT_LONG_SIDE: int = 640
+
+# Two-pass pose extraction: a cheap coarse pass (low fps and resolution, lite
+# model if present) locates the swing, then the full landmarker only runs over
+# that window plus PADDING_MARGIN_FRAMES. Frames outside it get no pose.
+TWO_PASS_POSE: bool = False
+COARSE_POSE_FPS: int = 5
+COARSE_POSE_LONG_SIDE: int = 320
+
+# Multi-process pose extraction (services/parallel_pose.py): the resampled
+# timeline is split into chunks run by PARALLEL_POSE_WORKERS processes, each
+# chunk preceded by OVERLAP warm-up frames that are dropped when stitching.
+# 0 = off (one landmarker per video). Videos shorter than a chunk run inline.
+PARALLEL_POSE_WORKERS: int = 0
+PARALLEL_POSE_CHUNK_FRAMES: int = 150
+PARALLEL_POSE_OVERLAP_FRAMES: int = 15
+PARALLEL_POSE_START_METHOD = "spawn"
+
+# On-disk cache of raw pose sequences keyed by the video bytes, the pose model
+# file(s) and the decode settings (services/pose_cache.py); a hit skips pose
+# extraction entirely. Least recently used entries are evicted past the cap.
+POSE_CACHE_ENABLED: bool = True
+POSE_CACHE_DIR = BASE_DIR.parent / ".pose_cache"
+POSE_CACHE_MAX_MB: int = 1024
+
+# Poses and band a metrics-only analysis keeps for the deferred overlay render,
+# one file per output video. Kept out of processed/, which the web server
+# serves publicly.
+RENDER_STATE_DIR = BASE_DIR.parent / ".render_state"
+
+# Video decoder backend: "opencv" (cv2.VideoCapture) or "ffmpeg" (raw frames
+# piped from an ffmpeg process, resampled/scaled by its select/scale filters).
+VIDEO_DECODER = "opencv"
+FFMPEG_BINARY = "ffmpeg"
+FFMPEG_DECODE_THREADS: int = 2
+
+# Run decode, pose, overlay and writing as threads connected by bounded queues
+# so they overlap (cv2/mediapipe release the GIL). Queue size is in frames.
+PIPELINED_EXECUTION: bool = True
+PIPELINE_QUEUE_SIZE: int = 4
+
+# Client landmark tracks (uploaded instead of server-side pose extraction):
+# resampled frames with no track frame within this many seconds have no pose.
+LANDMARK_TRACK_MAX_GAP_S: float = 0.1
+
+# Multi-swing segmentation of long recordings (range sessions): keep wrist
+# speed peaks down to this fraction of the strongest one, at least this far
+# apart, with at least this many frames at half the peak speed.
+MULTI_SWING_MIN_PEAK_RATIO: float = 0.3
+MULTI_SWING_MIN_GAP_S: float = 1.0
+MULTI_SWING_MIN_ACTIVE_FRAMES: int = 3
+
+# Stop decoding and pose extraction once the swing is over (OnlineSwingDetector):
+# the wrist speed peak must reach ONLINE_SWING_MIN_PEAK_SPEED (image sizes/s)
+# and stay the fastest for ONLINE_SWING_SETTLE_S after the window ends. Off by
+# default: a faster non-swing motion before the swing makes the run stop early.
+# Not used with PARALLEL_POSE_WORKERS (chunks are already in flight).
+ONLINE_SWING_DETECTION: bool = False
+ONLINE_SWING_MIN_PEAK_SPEED: float = 1.0
+ONLINE_SWING_SETTLE_S: float = 1.0
+
+# Where FeatureEngineer.save_sample() writes training samples: "store" appends
+# them to the sharded FeatureStore (uncompressed .npy shards of
+# FEATURE_STORE_SHARD_SIZE samples, opened with np.memmap, plus a JSONL index);
+# "npz" writes the legacy compressed file pair per sample.
+FEATURE_STORAGE: str = "store"
+FEATURE_STORE_SHARD_SIZE: int = 512
+
+# Training DataLoader (services/dataset.py): worker processes reading batches
+# ahead of the training loop and how they start (independent of the pose pool
+# start method), batches each of them keeps ready, and the largest split
+# (bytes of features) held in RAM instead of read from disk every epoch.
+DATASET_LOADER_WORKERS: int = 2
+DATASET_LOADER_START_METHOD: str = "spawn"
+DATASET_PREFETCH_BATCHES: int = 2
+DATASET_CACHE_MAX_BYTES: int = 2 * 1024**3
+
 VIDEO_EXTENSIONS: Tuple[str, ...] = (".mp4", ".mov", ".mkv", ".avi")
 ENVIRONMENTS: Tuple[str, ...] = ("indoor", "outdoor")
 BANDS: Tuple[str, ...] = ("1_2", "2_4", "4_6", "6_8", "8_10")
@@ -112,6 +231,7 @@ FINAL_FEATURE_SUBDIR = "features"
 FINAL_SPLIT_SUBDIR = "splits"
 SCALER_FILENAME = "feature_scaler.json"
 INTERPOLATION_MASK_SUBDIR = "interp_masks"
+FEATURE_STORE_SUBDIR = "feature_store"
 
 
 def ensure_directories() -> None:
@@ -0,0 +1,279 @@
+"""PyTorch Dataset / DataLoader over the processed training samples.
+
+Usage (one timed pass over a split):
+    python -m services.dataset [--split train] [--batch-size N] [--workers N]
+                               [--no-cache]
+
+Samples come from the FeatureStore (or processed_metadata.csv for .npz
+builds), split by their base video's entry in dataset_splits.json. Batches
+are (X_joint (B, T, 429), X_global (B, T, 3), y (B,)) tensors, normalised
+with the versioned scaler while loading:
+
+- __getitems__ reads a whole batch at once (FeatureStore rows gathered per
+  shard in row order, one scaler transform per batch), so the DataLoader
+  never stacks single samples.
+- A split whose features fit in DATASET_CACHE_MAX_BYTES is loaded into RAM
+  once and batches are sliced from it.
+- Otherwise worker processes read batches ahead of the training loop; batches
+  are pinned for fast host-to-GPU copies when CUDA is available.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import torch
+from torch.utils.data import DataLoader, Dataset
+
+import services.config as config
+from services.feature_engineering import load_saved_batch, load_scaler
+from services.feature_store import FeatureStore, default_store_root
+
+# Samples read per chunk while filling the in-RAM cache.
+CACHE_LOAD_ROWS = 256
+
+
+def _read_metadata_csv() -> List[Dict]:
+    path = config.OUTPUT_ROOT / config.FINAL_METADATA_SUBDIR / "processed_metadata.csv"
+    records = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            # Columns of the other storage layout are empty.
+            record: Dict = {k: v for k, v in row.items() if v != ""}
+            for key in ("band_id", "longest_dropout", "store_shard", "store_row"):
+                if key in record:
+                    record[key] = int(float(record[key]))
+            for key in ("interpolation_ratio", "valid_ratio", "mean_visibility"):
+                if key in record:
+                    record[key] = float(record[key])
+            for key in ("augmented", "low_quality"):
+                record[key] = record.get(key) == "True"
+            records.append(record)
+    return records
+
+
+def load_split_records(
+    split: str,
+    exclude_low_quality: bool = False,
+    max_interpolation_ratio: Optional[float] = None,
+    include_augmented: bool = True,
+) -> List[Dict]:
+    """Saved sample records of one split ("train", "val" or "test").
+
+    A record's split is that of its (base) video in dataset_splits.json;
+    augmented copies are only kept for train videos, so copies of videos a
+    rebuild moved to val/test never leak into training. Records of videos
+    missing from the split map are skipped. Filters use the same record fields
+    as the scaler fit (low_quality, interpolation_ratio).
+    """
+    split_path = config.OUTPUT_ROOT / config.FINAL_SPLIT_SUBDIR / "dataset_splits.json"
+    split_map = json.loads(split_path.read_text(encoding="utf-8"))
+
+    if config.FEATURE_STORAGE == "store" and FeatureStore.exists(default_store_root()):
+        records = FeatureStore().records()
+    else:
+        records = _read_metadata_csv()
+
+    selected = []
+    for rec in records:
+        augmented = bool(rec.get("augmented", False))
+        rec_split = split_map.get(str(rec["video_id"]))
+        if rec_split != split or (augmented and rec_split != "train"):
+            continue
+        if augmented and not include_augmented:
+            continue
+        if exclude_low_quality and rec.get("low_quality", False):
+            continue
+        if (
+            max_interpolation_ratio is not None
+            and float(rec.get("interpolation_ratio", 0.0)) > max_interpolation_ratio
+        ):
+            continue
+        selected.append(rec)
+    return selected
+
+
+def _collate_batch(batch):
+    # __getitems__ already returns stacked tensors.
+    return batch
+
+
+class SwingDataset(Dataset):
+    def __init__(
+        self,
+        split: str = "train",
+        records: Optional[List[Dict]] = None,
+        scaler_version: Optional[str] = None,
+        normalize: bool = True,
+        cache: Optional[bool] = None,
+        exclude_low_quality: bool = False,
+        max_interpolation_ratio: Optional[float] = None,
+        include_augmented: bool = True,
+    ) -> None:
+        """records defaults to load_split_records(split, ...). cache=None
+        keeps the split in RAM when it fits in DATASET_CACHE_MAX_BYTES."""
+        self.split = split
+        if records is None:
+            records = load_split_records(
+                split, exclude_low_quality, max_interpolation_ratio, include_augmented
+            )
+        self.records = records
+
+        self.scaler = None
+        if normalize:
+            self.scaler = load_scaler(version=scaler_version)
+            if self.scaler is None:
+                raise FileNotFoundError(
+                    "No feature scaler found; run services.build_dataset first"
+                )
+
+        self._store: Optional[FeatureStore] = None
+        self._cache: Optional[Tuple[torch.Tensor, ...]] = None
+        if cache is None:
+            cache = self.nbytes() <= config.DATASET_CACHE_MAX_BYTES
+        if cache and self.records:
+            self._fill_cache()
+
+    @property
+    def cached(self) -> bool:
+        return self._cache is not None
+
+    @property
+    def store(self) -> FeatureStore:
+        # Opened per process: memmaps are not sent to DataLoader workers.
+        if self._store is None:
+            self._store = FeatureStore()
+        return self._store
+
+    def __getstate__(self) -> Dict:
+        state = dict(self.__dict__)
+        state["_store"] = None
+        return state
+
+    def nbytes(self) -> int:
+        """Size of the split's model inputs in RAM."""
+        per_sample = (
+            config.N_FRAMES
+            * (33 * config.POSE_JOINT_FEATURE_DIM + config.POSE_GLOBAL_FEATURE_DIM)
+            * 4
+            + 8
+        )
+        return len(self.records) * per_sample
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __getitem__(self, index: int) -> Tuple[torch.Tensor, ...]:
+        return tuple(t[0] for t in self.__getitems__([index]))
+
+    def __getitems__(self, indices: Sequence[int]) -> Tuple[torch.Tensor, ...]:
+        """(X_joint (B, T, 429), X_global (B, T, 3), y (B,)) for a batch."""
+        if self._cache is not None:
+            index = torch.as_tensor(indices, dtype=torch.long)
+            return tuple(t[index] for t in self._cache)
+        return self._load(indices)
+
+    def _load(self, indices: Sequence[int]) -> Tuple[torch.Tensor, ...]:
+        batch = load_saved_batch(
+            [self.records[i] for i in indices], store=self.store, scaler=self.scaler
+        )
+        X_joint = batch["X_joint"]
+        N, T, J, D = X_joint.shape
+        return (
+            torch.from_numpy(X_joint.reshape(N, T, J * D)),
+            torch.from_numpy(batch["X_global"]),
+            torch.from_numpy(batch["y"]),
+        )
+
+    def _fill_cache(self) -> None:
+        n = len(self.records)
+        cache = None
+        for start in range(0, n, CACHE_LOAD_ROWS):
+            stop = min(n, start + CACHE_LOAD_ROWS)
+            batch = self._load(range(start, stop))
+            if cache is None:
+                cache = tuple(
+                    torch.empty((n, *t.shape[1:]), dtype=t.dtype) for t in batch
+                )
+            for dst, src in zip(cache, batch):
+                dst[start:stop] = src
+        self._cache = cache
+
+
+def make_dataloader(
+    split: str = "train",
+    batch_size: int = 64,
+    shuffle: Optional[bool] = None,
+    workers: Optional[int] = None,
+    pin_memory: Optional[bool] = None,
+    **dataset_kwargs,
+) -> DataLoader:
+    """DataLoader over SwingDataset(split, **dataset_kwargs).
+
+    Shuffles train only (seeded with RANDOM_SEED) by default. A cached split
+    is read in the main process; workers would only copy it.
+    """
+    dataset = SwingDataset(split, **dataset_kwargs)
+    if shuffle is None:
+        shuffle = split == "train"
+    if workers is None:
+        workers = config.DATASET_LOADER_WORKERS
+    if dataset.cached:
+        workers = 0
+    if pin_memory is None:
+        pin_memory = torch.cuda.is_available()
+
+    generator = torch.Generator()
+    generator.manual_seed(config.RANDOM_SEED)
+    return DataLoader(
+        dataset,
+        batch_size=batch_size,
+        shuffle=shuffle,
+        num_workers=workers,
+        collate_fn=_collate_batch,
+        pin_memory=pin_memory,
+        generator=generator,
+        persistent_workers=workers > 0,
+        prefetch_factor=config.DATASET_PREFETCH_BATCHES if workers > 0 else None,
+        multiprocessing_context=(
+            config.DATASET_LOADER_START_METHOD if workers > 0 else None
+        ),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--split", default="train")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--no-cache", action="store_true", help="read every batch from disk"
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    loader = make_dataloader(
+        args.split,
+        args.batch_size,
+        workers=args.workers,
+        cache=False if args.no_cache else None,
+    )
+    ready = time.perf_counter()
+    samples = 0
+    for X_joint, X_global, y in loader:
+        samples += len(y)
+    elapsed = time.perf_counter() - ready
+    print(
+        f"{args.split}: {samples} sample(s) in {len(loader)} batch(es), "
+        f"setup {ready - start:.2f}s, epoch {elapsed:.2f}s "
+        f"({samples / max(elapsed, 1e-9):.0f} samples/s, "
+        f"cached={loader.dataset.cached})"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -4,27 +4,34 @@ Contract:
 - Joint features: X_joint (T, 33, 13)
 - Global features: X_global (T, 3)
 - Label: y (int64), plus band_str for reference
-- Interpolation mask saved in a parallel folder, same stem as sequence file.
+- Samples go to the sharded FeatureStore (FEATURE_STORAGE="store"), or to a
+  .npz per sample with the interpolation mask in a parallel folder, same stem
+  as the sequence file ("npz").
 
 Key fixes:
 - Temporal leakage removed: causal backward differences
 - Global metrics are NOT broadcast across joints
 - Only augmentation supported: missingness dropout (no interpolation smoothing)
 - Scaler fit: train-only, non-augmented, vectorized exclusion of interpolated joints
+- Saved features stay raw; readers apply the versioned scaler at load time
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
+import os
 import random
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 
 import services.config as config
 from pipeline.types import PoseSequence, QualityMetrics, SamplePayload
+from services.feature_store import FeatureStore
 
 
 ANGLE_TRIPLETS = {
@@ -49,16 +56,38 @@ class RunningFeatureStats:
         self.m2 = np.zeros(self.feature_dim, dtype=np.float64)
 
     def update(self, feature_block: np.ndarray) -> None:
-        """Update with (N, D) or (..., D)."""
+        """Update with (N, D) or (..., D).
+
+        The block's moments are computed in one pass and folded in with the
+        pairwise (Chan et al.) combination, equivalent to per-row Welford.
+        """
         flat = feature_block.reshape(-1, self.feature_dim).astype(
             np.float64, copy=False
         )
-        for vec in flat:
-            self.count += 1
-            delta = vec - self.mean
-            self.mean += delta / self.count
-            delta2 = vec - self.mean
-            self.m2 += delta * delta2
+        n = flat.shape[0]
+        if n == 0:
+            return
+        block_mean = flat.mean(axis=0)
+        centered = flat - block_mean
+        block_m2 = np.einsum("nd,nd->d", centered, centered)
+        self._combine(n, block_mean, block_m2)
+
+    def merge(self, other: "RunningFeatureStats") -> "RunningFeatureStats":
+        """Fold in statistics gathered separately (e.g. per shard); returns self."""
+        if other.feature_dim != self.feature_dim:
+            raise ValueError(
+                f"Cannot merge stats of dim {other.feature_dim} into {self.feature_dim}"
+            )
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+        return self
+
+    def _combine(self, n: int, mean: np.ndarray, m2: np.ndarray) -> None:
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (n / total)
+        self.m2 = self.m2 + m2 + delta * delta * (self.count * n / total)
+        self.count = total
 
     def finalize(self) -> Tuple[np.ndarray, np.ndarray]:
         if self.count < 2:
@@ -69,13 +98,317 @@ class RunningFeatureStats:
         return self.mean.astype(np.float32), std.astype(np.float32)
 
 
+def scaler_version(
+    joint_mean: np.ndarray,
+    joint_std: np.ndarray,
+    global_mean: np.ndarray,
+    global_std: np.ndarray,
+) -> str:
+    """Content hash of the scaler statistics."""
+    digest = hashlib.sha1()
+    for array in (joint_mean, joint_std, global_mean, global_std):
+        digest.update(np.asarray(array, dtype=np.float32).tobytes())
+    return digest.hexdigest()[:12]
+
+
+@dataclass(frozen=True)
+class FeatureScaler:
+    """Per-feature standardisation fitted by finalize_scaler().
+
+    Saved samples are never normalised on disk; readers apply transform() at
+    load time, so refitting only writes a new scaler artifact. version names
+    the artifact (feature_scaler.<version>.json) the statistics came from.
+    """
+
+    joint_mean: np.ndarray  # (13,)
+    joint_std: np.ndarray  # (13,)
+    global_mean: np.ndarray  # (3,)
+    global_std: np.ndarray  # (3,)
+    version: str = ""
+
+    @classmethod
+    def from_json(cls, path: Path) -> "FeatureScaler":
+        with open(path, "r", encoding="utf-8") as f:
+            scaler_data = json.load(f)
+
+        j_mean = np.array(scaler_data["joint_mean"], dtype=np.float32)
+        j_std = np.array(scaler_data["joint_std"], dtype=np.float32)
+        g_mean = np.array(scaler_data["global_mean"], dtype=np.float32)
+        g_std = np.array(scaler_data["global_std"], dtype=np.float32)
+        # Files written before versioning get the version they would have had.
+        version = scaler_data.get("version") or scaler_version(
+            j_mean, j_std, g_mean, g_std
+        )
+        j_std[j_std == 0] = 1.0
+        g_std[g_std == 0] = 1.0
+        return cls(
+            joint_mean=j_mean,
+            joint_std=j_std,
+            global_mean=g_mean,
+            global_std=g_std,
+            version=version,
+        )
+
+    def transform(
+        self, joint_features: np.ndarray, global_features: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Standardise joint (..., 13) and global (..., 3) features, one sample
+        or a whole batch."""
+        joint = (joint_features - self.joint_mean) / self.joint_std
+        global_ = (global_features - self.global_mean) / self.global_std
+        return joint.astype(np.float32, copy=False), global_.astype(
+            np.float32, copy=False
+        )
+
+
+_SCALER_CACHE: Dict[Path, Tuple[int, FeatureScaler]] = {}
+
+
+def default_scaler_path() -> Path:
+    return config.OUTPUT_ROOT / config.FINAL_FEATURE_SUBDIR / config.SCALER_FILENAME
+
+
+def versioned_scaler_path(version: str) -> Path:
+    """feature_scaler.<version>.json, kept next to the current scaler."""
+    path = default_scaler_path()
+    return path.with_name(f"{path.stem}.{version}{path.suffix}")
+
+
+def load_scaler(
+    path: Optional[Path] = None, version: Optional[str] = None
+) -> Optional[FeatureScaler]:
+    """Cached FeatureScaler; the JSON is only re-parsed when the file changes.
+
+    Loads the current scaler, or the artifact of a given version. Returns None
+    if no such scaler has been written.
+    """
+    if path is None:
+        path = versioned_scaler_path(version) if version else default_scaler_path()
+    path = Path(path)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    cached = _SCALER_CACHE.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    scaler = FeatureScaler.from_json(path)
+    _SCALER_CACHE[path] = (mtime, scaler)
+    return scaler
+
+
+# key joints that drive global features:
+# shoulders (11,12), hips (23,24) for x_factor + hip_shoulder_sep
+# wrists (15,16) for max_wrist_speed
+GLOBAL_KEY_JOINTS = np.array([11, 12, 23, 24, 15, 16], dtype=int)
+
+# Samples read from a FeatureStore shard at a time (~17 MB of X_joint).
+STORE_READ_ROWS = 100
+
+
+def load_saved_sample(
+    record: Dict,
+    store: Optional[FeatureStore] = None,
+    scaler: Optional[FeatureScaler] = None,
+) -> Optional[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]]:
+    """(X_joint, X_global, interpolation_mask or None) of a saved sample
+    record, from the FeatureStore or its .npz pair; None when it is gone.
+
+    Features are raw unless a scaler is given.
+    """
+    sample = _read_saved_sample(record, store)
+    if sample is None or scaler is None:
+        return sample
+    X_joint, X_global = scaler.transform(sample[0], sample[1])
+    return X_joint, X_global, sample[2]
+
+
+def load_saved_batch(
+    records: List[Dict],
+    store: Optional[FeatureStore] = None,
+    scaler: Optional[FeatureScaler] = None,
+) -> Dict[str, np.ndarray]:
+    """Stacked X_joint (N,T,33,13), X_global (N,T,3), y (N,) and
+    interpolation_mask (N,T,33) of saved sample records, in order.
+
+    FeatureStore samples are gathered shard by shard in row order; the scaler
+    (if any) is applied once to the whole batch. Raises KeyError when a
+    record's sample is gone. No records give empty (0, ...) arrays.
+    """
+    if not records:
+        T, D = config.N_FRAMES, config.POSE_JOINT_FEATURE_DIM
+        return {
+            "X_joint": np.zeros((0, T, 33, D), dtype=np.float32),
+            "X_global": np.zeros(
+                (0, T, config.POSE_GLOBAL_FEATURE_DIM), dtype=np.float32
+            ),
+            "y": np.zeros(0, dtype=np.int64),
+            "interpolation_mask": np.zeros((0, T, 33), dtype=bool),
+        }
+
+    store_records = [rec for rec in records if "store_row" in rec]
+    if store_records:
+        store = store if store is not None else FeatureStore()
+        missing = [rec for rec in store_records if not store.has_record(rec)]
+        if missing:
+            name = missing[0]["sample_name"]
+            raise KeyError(f"Sample not in the feature store: {name}")
+
+    if len(store_records) == len(records):
+        batch = store.take(records)
+    else:
+        samples = []
+        for rec in records:
+            sample = _read_saved_sample(rec, store)
+            if sample is None:
+                raise KeyError(f"Saved sample is gone: {rec.get('sequence_path')}")
+            X_joint, X_global, interp_mask = sample
+            if interp_mask is None:
+                interp_mask = np.zeros(X_joint.shape[:2], dtype=bool)
+            samples.append((X_joint, X_global, interp_mask))
+        batch = {
+            "X_joint": np.stack([s[0] for s in samples]).astype(np.float32),
+            "X_global": np.stack([s[1] for s in samples]).astype(np.float32),
+            "y": np.array([rec["band_id"] for rec in records], dtype=np.int64),
+            "interpolation_mask": np.stack([s[2] for s in samples]),
+        }
+
+    if scaler is not None:
+        batch["X_joint"], batch["X_global"] = scaler.transform(
+            batch["X_joint"], batch["X_global"]
+        )
+    return batch
+
+
+def _read_saved_sample(
+    record: Dict, store: Optional[FeatureStore] = None
+) -> Optional[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]]:
+    if "store_row" in record:
+        store = store if store is not None else FeatureStore()
+        if not store.has_record(record):
+            return None
+        sample = store.load(record)
+        return (
+            np.array(sample["X_joint"]),
+            np.array(sample["X_global"]),
+            np.array(sample["interpolation_mask"]),
+        )
+
+    seq_path = config.BASE_DIR / Path(str(record["sequence_path"]))
+    if not seq_path.exists():
+        return None
+    with np.load(seq_path, allow_pickle=True) as data:
+        X_joint, X_global = data["X_joint"], data["X_global"]
+    mask_path_str = record.get("interpolation_mask_path")
+    if mask_path_str:
+        mask_path = config.BASE_DIR / Path(str(mask_path_str))
+    else:
+        mask_path = FeatureEngineer._infer_mask_path_from_sequence_path(seq_path)
+    interp_mask = None
+    if mask_path.exists():
+        with np.load(mask_path, allow_pickle=True) as m:
+            interp_mask = m["interpolation_mask"].astype(bool)
+    return X_joint, X_global, interp_mask
+
+
+def fit_feature_stats(
+    records: List[Dict],
+) -> Tuple[RunningFeatureStats, RunningFeatureStats, int]:
+    """(joint stats, global stats, samples used) over saved sample records.
+
+    Module-level so worker processes can run it on a shard of the records.
+    """
+    stats_joint = RunningFeatureStats(config.POSE_JOINT_FEATURE_DIM)
+    stats_global = RunningFeatureStats(config.POSE_GLOBAL_FEATURE_DIM)
+    used = 0
+
+    store_records = [rec for rec in records if "store_row" in rec]
+    if store_records:
+        store = FeatureStore()
+        store_records = [rec for rec in store_records if store.has_record(rec)]
+        for arrays, rows, _ in store.iter_shards(store_records):
+            # A block of samples per update: contiguous rows, one read each.
+            for i in range(0, len(rows), STORE_READ_ROWS):
+                block = rows[i : i + STORE_READ_ROWS]
+                X_joint = arrays["X_joint"][block]  # (N,T,33,13)
+                X_global = arrays["X_global"][block]  # (N,T,3)
+                interp_mask = arrays["interpolation_mask"][block]  # (N,T,33)
+
+                valid_joint = X_joint[~interp_mask]
+                if valid_joint.size > 0:
+                    stats_joint.update(valid_joint)
+                bad_t = np.any(interp_mask[:, :, GLOBAL_KEY_JOINTS], axis=2)
+                good_global = X_global[~bad_t]
+                if good_global.size > 0:
+                    stats_global.update(good_global)
+            used += len(rows)
+        store.close()
+
+    for rec in records:
+        if "store_row" in rec:
+            continue
+        seq_path = config.BASE_DIR / Path(str(rec["sequence_path"]))
+        if not seq_path.exists():
+            continue
+
+        data = np.load(seq_path, allow_pickle=True)
+        X_joint = data.get("X_joint")
+        X_global = data.get("X_global")
+        if X_joint is None:
+            continue
+
+        # Get mask path robustly: prefer recorded path
+        mask_path_str = rec.get("interpolation_mask_path")
+        if mask_path_str:
+            mask_path = config.BASE_DIR / Path(str(mask_path_str))
+        else:
+            mask_path = FeatureEngineer._infer_mask_path_from_sequence_path(seq_path)
+
+        if mask_path.exists():
+            m = np.load(mask_path, allow_pickle=True)
+            interp_mask = m["interpolation_mask"].astype(bool)  # (T,33)
+
+            # ---- Joint stats: exclude interpolated joints ----
+            # X_joint: (T,33,13), interp_mask: (T,33)
+            valid_joint = X_joint[~interp_mask]  # (K,13)
+            if valid_joint.size > 0:
+                stats_joint.update(valid_joint)
+
+            # ---- Global stats: exclude timesteps where key joints were interpolated ----
+            if X_global is not None:
+                bad_t = np.any(interp_mask[:, GLOBAL_KEY_JOINTS], axis=1)  # (T,)
+                good_global = X_global[~bad_t]
+                if good_global.size > 0:
+                    stats_global.update(good_global)
+        else:
+            # No mask: include everything
+            stats_joint.update(X_joint)
+            if X_global is not None:
+                stats_global.update(X_global)
+
+        used += 1
+
+    return stats_joint, stats_global, used
+
+
 class FeatureEngineer:
-    def __init__(self) -> None:
+    def __init__(self, storage: Optional[str] = None) -> None:
+        self.storage = storage or config.FEATURE_STORAGE
+        self._feature_store: Optional[FeatureStore] = None
         self.stats_joint = RunningFeatureStats(config.POSE_JOINT_FEATURE_DIM)  # 13
         self.stats_global = RunningFeatureStats(config.POSE_GLOBAL_FEATURE_DIM)  # 3
         self.samples: List[SamplePayload] = []
         self.sample_records: List[Dict[str, object]] = []
 
+    @property
+    def feature_store(self) -> FeatureStore:
+        # Opened on first use: serving never saves samples.
+        if self._feature_store is None:
+            self._feature_store = FeatureStore()
+        return self._feature_store
+
     # ------------------- FEATURES -------------------
     def compute_features(
         self, pose_sequence: PoseSequence
@@ -166,7 +499,10 @@ class FeatureEngineer:
         quality: QualityMetrics,
         metadata: Dict[str, float],
         augmented_suffix: str = "",
+        record_extra: Optional[Dict[str, object]] = None,
     ) -> SamplePayload:
+        """Save one sample; record_extra adds fields to its sample record
+        (and FeatureStore index entry)."""
         if env not in config.ENVIRONMENTS:
             raise ValueError(f"Unknown env: {env}. Valid: {list(config.ENVIRONMENTS)}")
 
@@ -179,8 +515,87 @@ class FeatureEngineer:
         interpolation_ratio = float(np.mean(interpolation_mask))
 
         suffix = f"__{augmented_suffix}" if augmented_suffix else ""
-        sample_name = f"{video_id}{suffix}__{env}__{band}"
+        sample_name = self.sample_name(video_id, env, band, augmented_suffix)
+
+        record: Dict[str, object] = {
+            "video_id": video_id,
+            "sample_name": sample_name,
+            "augmented": bool(augmented_suffix),
+            "env": env,
+            "band": band,
+            "band_id": band_id,
+            "low_quality": bool(quality.low_quality),
+            "valid_ratio": float(quality.valid_ratio),
+            "mean_visibility": float(quality.mean_visibility),
+            "longest_dropout": int(quality.longest_dropout),
+            "interpolation_ratio": float(interpolation_ratio),
+        }
+        if record_extra:
+            record.update(record_extra)
+
+        if self.storage == "store":
+            entry = self.feature_store.append(
+                sample_name,
+                record,
+                X_joint=joint_features,
+                X_global=global_features,
+                y=band_id,
+                interpolation_mask=interpolation_mask,
+            )
+            record["store_shard"] = entry["store_shard"]
+            record["store_row"] = entry["store_row"]
+            sequence_path = mask_path = self.feature_store.root
+        else:
+            sequence_path, mask_path = self._save_npz_pair(
+                sample_name,
+                video_id,
+                env,
+                band,
+                band_id,
+                joint_features,
+                global_features,
+                interpolation_mask,
+                quality,
+                interpolation_ratio,
+            )
+            # OUTPUT_ROOT may sit outside BASE_DIR (repo-level processed_videos)
+            record["sequence_path"] = os.path.relpath(sequence_path, config.BASE_DIR)
+            record["interpolation_mask_path"] = os.path.relpath(
+                mask_path, config.BASE_DIR
+            )
+
+        payload = SamplePayload(
+            video_id=video_id + suffix,
+            env=env,
+            band=band,
+            sequence_path=sequence_path,
+            interpolation_mask_path=mask_path,
+            metadata=metadata,
+        )
+        self.samples.append(payload)
+        self.sample_records.append(record)
+        return payload
+
+    @staticmethod
+    def sample_name(
+        video_id: str, env: str, band: str, augmented_suffix: str = ""
+    ) -> str:
+        suffix = f"__{augmented_suffix}" if augmented_suffix else ""
+        return f"{video_id}{suffix}__{env}__{band}"
 
+    @staticmethod
+    def _save_npz_pair(
+        sample_name: str,
+        video_id: str,
+        env: str,
+        band: str,
+        band_id: int,
+        joint_features: np.ndarray,
+        global_features: np.ndarray,
+        interpolation_mask: np.ndarray,
+        quality: QualityMetrics,
+        interpolation_ratio: float,
+    ) -> Tuple[Path, Path]:
         seq_dir = config.OUTPUT_ROOT / config.FINAL_SEQUENCE_SUBDIR
         mask_dir = config.OUTPUT_ROOT / config.INTERPOLATION_MASK_SUBDIR
         seq_dir.mkdir(parents=True, exist_ok=True)
@@ -213,34 +628,13 @@ class FeatureEngineer:
         np.savez_compressed(
             mask_path, interpolation_mask=interpolation_mask.astype(np.bool_)
         )
+        return sequence_path, mask_path
 
-        payload = SamplePayload(
-            video_id=video_id + suffix,
-            env=env,
-            band=band,
-            sequence_path=sequence_path,
-            interpolation_mask_path=mask_path,
-            metadata=metadata,
-        )
-        self.samples.append(payload)
-
-        self.sample_records.append(
-            {
-                "video_id": video_id,
-                "augmented": bool(augmented_suffix),
-                "env": env,
-                "band": band,
-                "band_id": band_id,
-                "sequence_path": str(sequence_path.relative_to(config.BASE_DIR)),
-                "interpolation_mask_path": str(mask_path.relative_to(config.BASE_DIR)),
-                "low_quality": bool(quality.low_quality),
-                "valid_ratio": float(quality.valid_ratio),
-                "mean_visibility": float(quality.mean_visibility),
-                "longest_dropout": int(quality.longest_dropout),
-                "interpolation_ratio": float(interpolation_ratio),
-            }
-        )
-        return payload
+    def sample_exists(self, record: Dict) -> bool:
+        """Whether a saved sample record's data is still on disk."""
+        if "store_row" in record:
+            return self.feature_store.has_record(record)
+        return (config.BASE_DIR / record["sequence_path"]).exists()
 
     # ------------------- AUGMENTATION: missingness only -------------------
     def augment_missingness_dropout(
@@ -291,12 +685,16 @@ class FeatureEngineer:
         self,
         exclude_low_quality: bool = True,
         interpolation_threshold: float = 0.3,
+        workers: int = 0,
     ) -> int:
         """Fit joint/global-feature scalers using train-only, non-augmented samples.
 
         Vectorized exclusion:
         - Joint stats: exclude interpolated (t,j) rows via interpolation_mask.
         - Global stats: exclude timesteps where key joints used by global features were interpolated.
+
+        With workers > 1 the samples are read in that many processes and the
+        per-shard statistics are merged.
         """
         # Hard guard against leakage by wrong call order
         if any("split" not in r for r in self.sample_records):
@@ -304,67 +702,33 @@ class FeatureEngineer:
                 "Missing 'split' in sample_records. Call export_splits() before fitting scaler to avoid leakage."
             )
 
+        records = [
+            rec
+            for rec in self.sample_records
+            if rec.get("split") == "train"
+            and not rec.get("augmented", False)
+            and not (exclude_low_quality and rec.get("low_quality", False))
+            and float(rec.get("interpolation_ratio", 0.0)) <= interpolation_threshold
+        ]
+
+        if workers > 1 and len(records) > 1:
+            # A few shards per worker keeps the pool busy when shards differ.
+            # Contiguous slices, so each reads neighbouring FeatureStore rows.
+            num_shards = min(len(records), workers * 4)
+            bounds = [i * len(records) // num_shards for i in range(num_shards + 1)]
+            shards = [records[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(fit_feature_stats, shards))
+        else:
+            results = [fit_feature_stats(records)]
+
         self.stats_joint = RunningFeatureStats(config.POSE_JOINT_FEATURE_DIM)  # 13
         self.stats_global = RunningFeatureStats(config.POSE_GLOBAL_FEATURE_DIM)  # 3
-
         used = 0
-
-        # key joints that drive global features:
-        # shoulders (11,12), hips (23,24) for x_factor + hip_shoulder_sep
-        # wrists (15,16) for max_wrist_speed
-        global_key = np.array([11, 12, 23, 24, 15, 16], dtype=int)
-
-        for rec in self.sample_records:
-            if rec.get("split") != "train":
-                continue
-            if rec.get("augmented", False):
-                continue
-            if exclude_low_quality and rec.get("low_quality", False):
-                continue
-            if float(rec.get("interpolation_ratio", 0.0)) > interpolation_threshold:
-                continue
-
-            seq_path = config.BASE_DIR / Path(str(rec["sequence_path"]))
-            if not seq_path.exists():
-                continue
-
-            data = np.load(seq_path, allow_pickle=True)
-            X_joint = data.get("X_joint")
-            X_global = data.get("X_global")
-            if X_joint is None:
-                continue
-
-            # Get mask path robustly: prefer recorded path
-            mask_path_str = rec.get("interpolation_mask_path")
-            if mask_path_str:
-                mask_path = config.BASE_DIR / Path(str(mask_path_str))
-            else:
-                mask_path = self._infer_mask_path_from_sequence_path(seq_path)
-
-            if mask_path.exists():
-                m = np.load(mask_path, allow_pickle=True)
-                interp_mask = m["interpolation_mask"].astype(bool)  # (T,33)
-
-                # ---- Joint stats: exclude interpolated joints ----
-                # X_joint: (T,33,13), interp_mask: (T,33)
-                valid_joint = X_joint[~interp_mask]  # (K,13)
-                if valid_joint.size > 0:
-                    self.stats_joint.update(valid_joint)
-
-                # ---- Global stats: exclude timesteps where key joints were interpolated ----
-                if X_global is not None:
-                    bad_t = np.any(interp_mask[:, global_key], axis=1)  # (T,)
-                    good_global = X_global[~bad_t]
-                    if good_global.size > 0:
-                        self.stats_global.update(good_global)
-            else:
-                # No mask: include everything
-                self.stats_joint.update(X_joint)
-                if X_global is not None:
-                    self.stats_global.update(X_global)
-
-            used += 1
-
+        for stats_joint, stats_global, shard_used in results:
+            self.stats_joint.merge(stats_joint)
+            self.stats_global.merge(stats_global)
+            used += shard_used
         return used
 
     @staticmethod
@@ -379,59 +743,34 @@ class FeatureEngineer:
         return seq_path.parent / seq_path.name
 
     def finalize_scaler(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Write the fitted statistics as a new scaler version.
+
+        The artifact feature_scaler.<version>.json is never modified;
+        feature_scaler.json is atomically replaced with the same content and
+        names the current version. Saved samples are left untouched.
+        """
         joint_mean, joint_std = self.stats_joint.finalize()
         global_mean, global_std = self.stats_global.finalize()
+        version = scaler_version(joint_mean, joint_std, global_mean, global_std)
 
-        out_dir = config.OUTPUT_ROOT / config.FINAL_FEATURE_SUBDIR
-        out_dir.mkdir(parents=True, exist_ok=True)
-        scaler_path = out_dir / config.SCALER_FILENAME
-        with open(scaler_path, "w", encoding="utf-8") as f:
-            json.dump(
-                {
-                    "joint_mean": joint_mean.tolist(),
-                    "joint_std": joint_std.tolist(),
-                    "global_mean": global_mean.tolist(),
-                    "global_std": global_std.tolist(),
-                },
-                f,
-                indent=2,
-            )
+        scaler_path = default_scaler_path()
+        scaler_path.parent.mkdir(parents=True, exist_ok=True)
+        content = json.dumps(
+            {
+                "version": version,
+                "joint_mean": joint_mean.tolist(),
+                "joint_std": joint_std.tolist(),
+                "global_mean": global_mean.tolist(),
+                "global_std": global_std.tolist(),
+            },
+            indent=2,
+        )
+        for path in (versioned_scaler_path(version), scaler_path):
+            tmp_path = path.with_name(path.name + ".tmp")
+            tmp_path.write_text(content, encoding="utf-8")
+            os.replace(tmp_path, path)
         return (joint_mean, joint_std, global_mean, global_std)
 
-    def normalize_saved_sequences(self, joint_mean, joint_std, global_mean, global_std):
-        jm = joint_mean.reshape(1, 1, -1)
-        js = joint_std.reshape(1, 1, -1)
-        gm = global_mean.reshape(1, -1)
-        gs = global_std.reshape(1, -1)
-
-        seq_dir = config.OUTPUT_ROOT / config.FINAL_SEQUENCE_SUBDIR
-        for npz_path in seq_dir.glob("*.npz"):
-            data = np.load(npz_path, allow_pickle=True)
-            X_joint = data.get("X_joint")
-            X_global = data.get("X_global")
-            if X_joint is None:
-                continue
-
-            normalized_joint = (X_joint - jm) / js
-            payload = {
-                k: data[k] for k in data.files if k not in ("X_joint", "X_global")
-            }
-
-            if X_global is not None:
-                normalized_global = (X_global - gm) / gs
-                np.savez_compressed(
-                    npz_path,
-                    X_joint=normalized_joint.astype(np.float32),
-                    X_global=normalized_global.astype(np.float32),
-                    **payload,
-                )
-            else:
-                np.savez_compressed(
-                    npz_path,
-                    X_joint=normalized_joint.astype(np.float32),
-                    **payload,
-                )
-
     # ------------------- EXPORTS -------------------
     def export_metadata(self) -> Path:
         import pandas as pd
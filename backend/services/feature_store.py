@@ -0,0 +1,334 @@
+"""Sharded, memory-mappable storage for training samples.
+
+Replaces the two compressed .npz files per sample (sequences/ and
+interp_masks/) with a few large arrays per shard that np.load(mmap_mode="r")
+opens without reading or decompressing anything:
+
+    <root>/meta.json                      shard size, per-sample shapes/dtypes
+    <root>/index.jsonl                    one line per saved sample
+    <root>/shard-00000/X_joint.npy        (shard_size, T, 33, 13) float32
+    <root>/shard-00000/X_global.npy       (shard_size, T, 3) float32
+    <root>/shard-00000/y.npy              (shard_size,) int64
+    <root>/shard-00000/interpolation_mask.npy  (shard_size, T, 33) bool
+
+A sample is written into the next free row of the last shard, then its index
+line (the sample record plus shard and row) is appended; the index line is
+the commit point, so a build interrupted between the two just reuses the row.
+Saving a sample under an existing name appends a new row and the latest index
+line wins.
+
+Existing .npz samples are converted with:
+    python -m services.feature_store [--sequences DIR] [--masks DIR]
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import shutil
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+import services.config as config
+
+ARRAY_NAMES: Tuple[str, ...] = ("X_joint", "X_global", "y", "interpolation_mask")
+
+
+def default_store_root() -> Path:
+    return config.OUTPUT_ROOT / config.FEATURE_STORE_SUBDIR
+
+
+class FeatureStore:
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        shard_size: int = config.FEATURE_STORE_SHARD_SIZE,
+    ) -> None:
+        self.root = Path(root) if root is not None else default_store_root()
+        self.index_path = self.root / "index.jsonl"
+        self.meta_path = self.root / "meta.json"
+        self.meta: Optional[Dict] = None
+        if self.meta_path.exists():
+            self.meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+        self.shard_size = self.meta["shard_size"] if self.meta else int(shard_size)
+
+        self._index: Dict[str, Dict] = {}
+        self._next_slot = (0, 0)
+        self._torn_tail = False
+        self._load_index()
+        self._readers: Dict[int, Dict[str, np.ndarray]] = {}
+        self._writer: Optional[Tuple[int, Dict[str, np.ndarray]]] = None
+
+    @staticmethod
+    def exists(root: Path) -> bool:
+        return (Path(root) / "meta.json").exists()
+
+    def clear(self) -> None:
+        self.close()
+        shutil.rmtree(self.root, ignore_errors=True)
+        self.meta = None
+        self._index = {}
+        self._next_slot = (0, 0)
+        self._torn_tail = False
+
+    def _load_index(self) -> None:
+        if not self.index_path.exists():
+            return
+        last = (-1, -1)
+        line = ""
+        with open(self.index_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # torn last line of an interrupted build
+                self._index[entry["sample_name"]] = entry
+                last = max(last, (entry["store_shard"], entry["store_row"]))
+        # The next line must not be glued onto a torn one.
+        self._torn_tail = bool(line) and not line.endswith("\n")
+        if last >= (0, 0):
+            shard, row = last
+            self._next_slot = (
+                (shard, row + 1) if row + 1 < self.shard_size else (shard + 1, 0)
+            )
+
+    # ------------------- READ -------------------
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def get(self, name: str) -> Optional[Dict]:
+        """Index entry of a saved sample, or None."""
+        entry = self._index.get(name)
+        return dict(entry) if entry is not None else None
+
+    def has_record(self, record: Dict) -> bool:
+        """Whether a saved sample record still points at its current row."""
+        entry = self._index.get(record.get("sample_name"))
+        return (
+            entry is not None
+            and entry["store_shard"] == record.get("store_shard")
+            and entry["store_row"] == record.get("store_row")
+        )
+
+    def records(self) -> List[Dict]:
+        """Index entries of the current samples, in storage order."""
+        return sorted(
+            self._index.values(),
+            key=lambda entry: (entry["store_shard"], entry["store_row"]),
+        )
+
+    def shard(self, shard: int) -> Dict[str, np.ndarray]:
+        """Read-only memmaps of one shard's arrays (rows past the last saved
+        sample are unused)."""
+        arrays = self._readers.get(shard)
+        if arrays is None:
+            shard_dir = self._shard_dir(shard)
+            arrays = {
+                name: np.load(shard_dir / f"{name}.npy", mmap_mode="r")
+                for name in ARRAY_NAMES
+            }
+            self._readers[shard] = arrays
+        return arrays
+
+    def load(self, entry: Dict) -> Dict[str, np.ndarray]:
+        """One sample's arrays (memmap views) for an index entry."""
+        arrays = self.shard(entry["store_shard"])
+        row = entry["store_row"]
+        return {name: array[row] for name, array in arrays.items()}
+
+    def iter_shards(
+        self, entries: List[Dict]
+    ) -> Iterator[Tuple[Dict[str, np.ndarray], np.ndarray, List[Dict]]]:
+        """(shard arrays, rows, entries) per shard for the given entries, rows
+        ascending, so callers can gather each shard in one sequential read."""
+        by_shard: Dict[int, List[Dict]] = {}
+        for entry in entries:
+            by_shard.setdefault(entry["store_shard"], []).append(entry)
+        for shard in sorted(by_shard):
+            shard_entries = sorted(by_shard[shard], key=lambda e: e["store_row"])
+            rows = np.array([e["store_row"] for e in shard_entries], dtype=np.int64)
+            yield self.shard(shard), rows, shard_entries
+
+    def take(self, entries: List[Dict]) -> Dict[str, np.ndarray]:
+        """Stacked arrays of several samples, in the order of entries."""
+        shapes, dtypes = self.meta["shapes"], self.meta["dtypes"]
+        out = {
+            name: np.empty((len(entries), *shapes[name]), dtype=np.dtype(dtypes[name]))
+            for name in ARRAY_NAMES
+        }
+        # Row order within each shard, so every gather reads the file forwards.
+        order = sorted(
+            range(len(entries)),
+            key=lambda i: (entries[i]["store_shard"], entries[i]["store_row"]),
+        )
+        for shard, group in itertools.groupby(
+            order, key=lambda i: entries[i]["store_shard"]
+        ):
+            where = list(group)
+            rows = [entries[i]["store_row"] for i in where]
+            arrays = self.shard(shard)
+            for name in ARRAY_NAMES:
+                out[name][where] = arrays[name][rows]
+        return out
+
+    # ------------------- WRITE -------------------
+    def append(
+        self,
+        name: str,
+        record: Dict,
+        X_joint: np.ndarray,
+        X_global: np.ndarray,
+        y: int,
+        interpolation_mask: np.ndarray,
+    ) -> Dict:
+        """Save one sample; returns its index entry (record + shard and row)."""
+        values = {
+            "X_joint": np.asarray(X_joint, dtype=np.float32),
+            "X_global": np.asarray(X_global, dtype=np.float32),
+            "y": np.asarray(y, dtype=np.int64),
+            "interpolation_mask": np.asarray(interpolation_mask, dtype=np.bool_),
+        }
+        if self.meta is None:
+            self._create(values)
+        for array_name, value in values.items():
+            expected = tuple(self.meta["shapes"][array_name])
+            if value.shape != expected:
+                raise ValueError(
+                    f"{array_name} shape {value.shape} does not match the "
+                    f"store's {expected}"
+                )
+
+        shard, row = self._next_slot
+        arrays = self._writable_shard(shard)
+        for array_name, value in values.items():
+            arrays[array_name][row] = value
+        for array in arrays.values():
+            array.flush()
+
+        entry = dict(record, sample_name=name, store_shard=shard, store_row=row)
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(("\n" if self._torn_tail else "") + json.dumps(entry) + "\n")
+        self._torn_tail = False
+        self._index[name] = entry
+        self._next_slot = (
+            (shard, row + 1) if row + 1 < self.shard_size else (shard + 1, 0)
+        )
+        return entry
+
+    def close(self) -> None:
+        if self._writer is not None:
+            for array in self._writer[1].values():
+                array.flush()
+        self._writer = None
+        self._readers = {}
+
+    def _create(self, values: Dict[str, np.ndarray]) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.meta = {
+            "shard_size": self.shard_size,
+            "shapes": {name: list(value.shape) for name, value in values.items()},
+            "dtypes": {name: value.dtype.str for name, value in values.items()},
+        }
+        self.meta_path.write_text(json.dumps(self.meta, indent=2), encoding="utf-8")
+
+    def _shard_dir(self, shard: int) -> Path:
+        return self.root / f"shard-{shard:05d}"
+
+    def _writable_shard(self, shard: int) -> Dict[str, np.ndarray]:
+        if self._writer is not None and self._writer[0] == shard:
+            return self._writer[1]
+        self.close()
+
+        shard_dir = self._shard_dir(shard)
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        arrays = {}
+        for name in ARRAY_NAMES:
+            path = shard_dir / f"{name}.npy"
+            if path.exists():
+                arrays[name] = np.lib.format.open_memmap(path, mode="r+")
+            else:
+                arrays[name] = np.lib.format.open_memmap(
+                    path,
+                    mode="w+",
+                    dtype=np.dtype(self.meta["dtypes"][name]),
+                    shape=(self.shard_size, *self.meta["shapes"][name]),
+                )
+        self._writer = (shard, arrays)
+        return arrays
+
+
+def convert_npz_samples(sequences_dir: Path, masks_dir: Path) -> int:
+    """Append every .npz sample pair to the default store; returns the count.
+
+    Goes through FeatureEngineer.save_sample(), so the index records match
+    those of a fresh build.
+    """
+    # Imported here: feature_engineering imports this module.
+    from pipeline.types import QualityMetrics
+    from services.feature_engineering import FeatureEngineer
+
+    feature_engineer = FeatureEngineer(storage="store")
+    count = 0
+    for seq_path in sorted(Path(sequences_dir).glob("*.npz")):
+        with np.load(seq_path, allow_pickle=True) as data:
+            X_joint, X_global = data["X_joint"], data["X_global"]
+            video_id = str(data["video_id"])
+            env, band = str(data["env"]), str(data["band_str"])
+            low_quality = bool(data["low_quality"])
+            quality = json.loads(str(data["quality_json"]))
+
+        mask_path = Path(masks_dir) / seq_path.name
+        if mask_path.exists():
+            with np.load(mask_path) as m:
+                interpolation_mask = m["interpolation_mask"]
+        else:
+            interpolation_mask = np.zeros(X_joint.shape[:2], dtype=bool)
+
+        # <video_id>[__<suffix>]__<env>__<band>
+        middle = seq_path.stem[len(video_id) : -len(f"__{env}__{band}")]
+        feature_engineer.save_sample(
+            video_id=video_id,
+            env=env,
+            band=band,
+            joint_features=X_joint,
+            global_features=X_global,
+            interpolation_mask=interpolation_mask,
+            quality=QualityMetrics(
+                valid_ratio=quality["valid_ratio"],
+                mean_visibility=quality["mean_visibility"],
+                keypoint_visibility={},
+                longest_dropout=quality["longest_dropout"],
+                low_quality=low_quality,
+            ),
+            metadata={},
+            augmented_suffix=middle[2:],
+        )
+        count += 1
+    feature_engineer.feature_store.close()
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Convert .npz samples into the feature store"
+    )
+    parser.add_argument(
+        "--sequences", default=str(config.OUTPUT_ROOT / config.FINAL_SEQUENCE_SUBDIR)
+    )
+    parser.add_argument(
+        "--masks", default=str(config.OUTPUT_ROOT / config.INTERPOLATION_MASK_SUBDIR)
+    )
+    args = parser.parse_args()
+
+    count = convert_npz_samples(Path(args.sequences), Path(args.masks))
+    print(f"Converted {count} sample(s) into {default_store_root()}")
+
+
+if __name__ == "__main__":
+    main()
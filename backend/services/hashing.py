@@ -0,0 +1,13 @@
+"""Content hashes of files, used to key on-disk caches."""
+
+from __future__ import annotations
+
+import hashlib
+
+
+def file_sha256(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,314 @@
+"""Inference backends for the GolfSwingModel prediction step.
+
+Backends (config.INFERENCE_BACKEND):
+- "torch": eager / TorchScript / int8-quantized PyTorch model
+- "onnx":  ONNX export of the model (coral + cls heads) run by onnxruntime on
+           CPU. Once the export is cached, serving never imports torch.
+
+Torch and onnxruntime are imported lazily so only the selected backend's
+runtime is loaded.
+
+Usage:
+    python -m services.inference_backend --export [--checkpoint PATH]
+    python -m services.inference_backend --parity [--checkpoint PATH]
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib.metadata
+import json
+import os
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+
+import services.config as config
+from services.hashing import file_sha256
+
+ONNX_INPUT_NAMES = ("joint_features", "global_features")
+ONNX_OUTPUT_NAMES = ("coral_logits", "cls_logits")
+
+
+def _softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - np.max(logits, axis=1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / np.sum(exp, axis=1, keepdims=True)
+
+
+class InferenceBackend:
+    """Runs the model on joint (B, T, 429) and global (B, T, 3) float32 batches.
+
+    scaler_fused is True when the model's input layers already standardise
+    the features, in which case callers must pass raw features.
+    """
+
+    name = "base"
+    scaler_fused = False
+
+    def predict(
+        self, joint_batch: np.ndarray, global_batch: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (coral_logits (B, 4), cls_logits (B, 5))."""
+        raise NotImplementedError
+
+    def predict_proba(
+        self, joint_batch: np.ndarray, global_batch: np.ndarray
+    ) -> np.ndarray:
+        """Class probabilities (B, 5) from the cls head."""
+        _, cls_logits = self.predict(joint_batch, global_batch)
+        return _softmax(cls_logits.astype(np.float32))
+
+    def warm_up(self, runs: int = config.MODEL_WARMUP_RUNS) -> "InferenceBackend":
+        joint = np.zeros(
+            (1, config.N_FRAMES, 33 * config.POSE_JOINT_FEATURE_DIM), dtype=np.float32
+        )
+        global_ = np.zeros(
+            (1, config.N_FRAMES, config.POSE_GLOBAL_FEATURE_DIM), dtype=np.float32
+        )
+        for _ in range(runs):
+            self.predict(joint, global_)
+        return self
+
+
+class TorchBackend(InferenceBackend):
+    name = "torch"
+
+    def __init__(self, model, scaler_fused: bool = False) -> None:
+        self.model = model
+        self.scaler_fused = scaler_fused
+
+    def predict(self, joint_batch, global_batch):
+        import torch
+
+        joint_tensor = torch.from_numpy(
+            np.ascontiguousarray(joint_batch, dtype=np.float32)
+        )
+        global_tensor = torch.from_numpy(
+            np.ascontiguousarray(global_batch, dtype=np.float32)
+        )
+        with torch.no_grad():
+            coral_logits, cls_logits = self.model(joint_tensor, global_tensor)
+        return coral_logits.numpy(), cls_logits.numpy()
+
+    def predict_proba(self, joint_batch, global_batch):
+        import torch
+
+        _, cls_logits = self.predict(joint_batch, global_batch)
+        return torch.softmax(torch.from_numpy(cls_logits), dim=1).numpy()
+
+    @classmethod
+    def from_checkpoint(cls, model_path=config.AI_MODEL_PATH) -> "TorchBackend":
+        from services import model_utils
+
+        fused = model_utils.is_scaler_fused(model_path)
+        if config.MODEL_QUANTIZE_INT8:
+            from services.quantization import load_quantized_model
+
+            return cls(load_quantized_model(model_path), fused).warm_up()
+        if config.MODEL_USE_COMPILED_ARTIFACT:
+            try:
+                return cls(model_utils.load_serving_model(model_path), fused)
+            except Exception as e:
+                print(f"Compiled model unavailable, using eager model: {e}")
+        return cls(model_utils.load_model(model_path), fused).warm_up()
+
+
+class OnnxBackend(InferenceBackend):
+    name = "onnx"
+
+    def __init__(
+        self, onnx_path, intra_op_threads: int = config.ONNX_INTRA_OP_THREADS
+    ) -> None:
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError(
+                "onnxruntime is required for INFERENCE_BACKEND='onnx' (pip install onnxruntime)"
+            ) from e
+
+        options = ort.SessionOptions()
+        if intra_op_threads > 0:
+            options.intra_op_num_threads = intra_op_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            str(onnx_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.scaler_fused = metadata.get("scaler_fused") == "1"
+
+    def predict(self, joint_batch, global_batch):
+        coral_logits, cls_logits = self.session.run(
+            list(ONNX_OUTPUT_NAMES),
+            {
+                ONNX_INPUT_NAMES[0]: np.ascontiguousarray(
+                    joint_batch, dtype=np.float32
+                ),
+                ONNX_INPUT_NAMES[1]: np.ascontiguousarray(
+                    global_batch, dtype=np.float32
+                ),
+            },
+        )
+        return coral_logits, cls_logits
+
+    @classmethod
+    def from_checkpoint(cls, model_path=config.AI_MODEL_PATH) -> "OnnxBackend":
+        onnx_path = onnx_artifact_path(model_path)
+        if not onnx_path.exists():
+            export_onnx(model_path, onnx_path)
+        return cls(onnx_path).warm_up()
+
+
+def _torch_version() -> str:
+    # From the package metadata: looking up the cached export must not
+    # import torch.
+    try:
+        return importlib.metadata.version("torch")
+    except importlib.metadata.PackageNotFoundError:
+        return "none"
+
+
+def onnx_artifact_path(model_path=config.AI_MODEL_PATH) -> Path:
+    """Cached ONNX export next to the checkpoint, keyed by checkpoint hash,
+    the exporting torch version and ONNX_OPSET."""
+    model_path = Path(model_path)
+    key = f"{file_sha256(model_path)}:{_torch_version()}:{config.ONNX_OPSET}"
+    key = hashlib.sha256(key.encode()).hexdigest()[:16]
+    return (
+        model_path.parent / config.MODEL_CACHE_SUBDIR / f"{model_path.stem}.{key}.onnx"
+    )
+
+
+def export_onnx(model_path=config.AI_MODEL_PATH, onnx_path=None) -> Path:
+    """Export both heads with dynamic batch and time axes."""
+    import torch
+
+    import onnx
+
+    from services.model_utils import is_scaler_fused, load_model
+
+    onnx_path = (
+        Path(onnx_path) if onnx_path is not None else onnx_artifact_path(model_path)
+    )
+    onnx_path.parent.mkdir(parents=True, exist_ok=True)
+
+    model = load_model(model_path, mmap=False)
+    joint = torch.zeros(1, config.N_FRAMES, 33 * config.POSE_JOINT_FEATURE_DIM)
+    global_ = torch.zeros(1, config.N_FRAMES, config.POSE_GLOBAL_FEATURE_DIM)
+    dynamic_axes = {name: {0: "batch", 1: "time"} for name in ONNX_INPUT_NAMES}
+    dynamic_axes.update({name: {0: "batch"} for name in ONNX_OUTPUT_NAMES})
+
+    # Write under a temporary name so concurrent workers never see a partial file.
+    tmp_path = onnx_path.with_name(f"{onnx_path.name}.{os.getpid()}.tmp")
+    torch.onnx.export(
+        model,
+        (joint, global_),
+        str(tmp_path),
+        input_names=list(ONNX_INPUT_NAMES),
+        output_names=list(ONNX_OUTPUT_NAMES),
+        dynamic_axes=dynamic_axes,
+        opset_version=config.ONNX_OPSET,
+        dynamo=False,
+    )
+
+    exported = onnx.load(str(tmp_path))
+    entry = exported.metadata_props.add()
+    entry.key, entry.value = "scaler_fused", "1" if is_scaler_fused(model_path) else "0"
+    onnx.save(exported, str(tmp_path))
+    os.replace(tmp_path, onnx_path)
+    return onnx_path
+
+
+def create_backend(
+    name: str = config.INFERENCE_BACKEND, model_path=config.AI_MODEL_PATH
+) -> InferenceBackend:
+    if name == "torch":
+        return TorchBackend.from_checkpoint(model_path)
+    if name == "onnx":
+        return OnnxBackend.from_checkpoint(model_path)
+    raise ValueError(f"Unknown inference backend: {name}. Valid: ['torch', 'onnx']")
+
+
+def check_parity(
+    model_path=config.AI_MODEL_PATH,
+    batch_size: int = 4,
+    time_steps: Tuple[int, ...] = (config.N_FRAMES, 37),
+    seed: int = config.RANDOM_SEED,
+) -> Dict[str, float]:
+    """Compare eager torch and ONNX Runtime outputs on random inputs.
+
+    Covers both heads, batch > 1 and a sequence length other than the one
+    used at export time.
+    """
+    from services.model_utils import load_model
+
+    torch_backend = TorchBackend(load_model(model_path, mmap=False))
+    onnx_path = onnx_artifact_path(model_path)
+    if not onnx_path.exists():
+        export_onnx(model_path, onnx_path)
+    onnx_backend = OnnxBackend(onnx_path)
+
+    rng = np.random.default_rng(seed)
+    report = {
+        "coral_max_abs_diff": 0.0,
+        "cls_max_abs_diff": 0.0,
+        "prob_max_abs_diff": 0.0,
+    }
+    agree = []
+    for T in time_steps:
+        joint = rng.standard_normal(
+            (batch_size, T, 33 * config.POSE_JOINT_FEATURE_DIM)
+        ).astype(np.float32)
+        global_ = rng.standard_normal(
+            (batch_size, T, config.POSE_GLOBAL_FEATURE_DIM)
+        ).astype(np.float32)
+
+        t_coral, t_cls = torch_backend.predict(joint, global_)
+        o_coral, o_cls = onnx_backend.predict(joint, global_)
+        t_probs = torch_backend.predict_proba(joint, global_)
+        o_probs = onnx_backend.predict_proba(joint, global_)
+
+        report["coral_max_abs_diff"] = max(
+            report["coral_max_abs_diff"], float(np.max(np.abs(t_coral - o_coral)))
+        )
+        report["cls_max_abs_diff"] = max(
+            report["cls_max_abs_diff"], float(np.max(np.abs(t_cls - o_cls)))
+        )
+        report["prob_max_abs_diff"] = max(
+            report["prob_max_abs_diff"], float(np.max(np.abs(t_probs - o_probs)))
+        )
+        agree.append(np.argmax(t_probs, 1) == np.argmax(o_probs, 1))
+
+    report["band_agreement"] = float(np.mean(np.concatenate(agree)))
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="GolfSwingModel inference backends")
+    parser.add_argument("--checkpoint", default=str(config.AI_MODEL_PATH))
+    parser.add_argument(
+        "--export", action="store_true", help="export the ONNX artifact"
+    )
+    parser.add_argument(
+        "--parity", action="store_true", help="compare torch vs onnxruntime"
+    )
+    parser.add_argument("--atol", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    if args.export:
+        print(export_onnx(args.checkpoint))
+    if args.parity:
+        report = check_parity(args.checkpoint)
+        print(json.dumps(report, indent=2))
+        ok = (
+            report["band_agreement"] == 1.0
+            and report["coral_max_abs_diff"] <= args.atol
+            and report["cls_max_abs_diff"] <= args.atol
+        )
+        raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Dynamic micro-batching of GolfSwingModel inference across concurrent jobs.
+
+Jobs submit one prepared feature sequence each; a single scheduler thread
+gathers them into one (B, T, 429) batch for the InferenceBackend and flushes
+when the batch is full or when the oldest request has waited max_wait_ms.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import List, Tuple
+
+import numpy as np
+
+import services.config as config
+
+
+class InferenceBatcher:
+    def __init__(
+        self,
+        backend,
+        max_batch_size: int = config.INFERENCE_MAX_BATCH_SIZE,
+        max_wait_ms: float = config.INFERENCE_MAX_WAIT_MS,
+    ) -> None:
+        self.backend = backend
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_s = max(0.0, max_wait_ms / 1000.0)
+        self._requests: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="inference-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, joint_feats: np.ndarray, global_feats: np.ndarray) -> Future:
+        """Queue one sequence: joint (T, 429), global (T, 3).
+
+        The future resolves to the (5,) probability vector for this sequence.
+        """
+        if self._closed:
+            raise RuntimeError("InferenceBatcher is closed")
+        future: Future = Future()
+        self._requests.put((joint_feats, global_feats, future))
+        return future
+
+    def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._requests.put(None)
+            self._thread.join()
+
+    def _run(self) -> None:
+        while True:
+            first = self._requests.get()
+            if first is None:
+                return
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait_s
+            stop = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = (
+                        self._requests.get(timeout=remaining)
+                        if remaining > 0
+                        else self._requests.get_nowait()
+                    )
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch: List[Tuple[np.ndarray, np.ndarray, Future]]) -> None:
+        # Sequences are resampled to N_FRAMES, but group by length to be safe.
+        groups = {}
+        for item in batch:
+            groups.setdefault(item[0].shape[0], []).append(item)
+
+        for items in groups.values():
+            try:
+                probs = self.backend.predict_proba(
+                    np.stack([joint for joint, _, _ in items]),
+                    np.stack([global_ for _, global_, _ in items]),
+                )
+            except Exception as e:
+                for _, _, future in items:
+                    future.set_exception(e)
+                continue
+
+            for (_, _, future), row in zip(items, probs):
+                future.set_result(row)
@@ -0,0 +1,114 @@
+"""Client-side landmark tracks as an alternative to server-side pose extraction.
+
+The web client already runs a MediaPipe PoseLandmarker while recording, so it
+can upload its landmark track alongside (or instead of) the video. A track is
+a .json or .npz file with:
+
+- landmarks: (T, 33, 4) x, y, z, visibility per frame, in MediaPipe's
+  normalized image coordinates. Frames without a detected pose are all zeros
+  (or NaN).
+- timestamps: (T,) capture time of each frame in seconds from the start of
+  the recording (the video's own timeline when both are uploaded),
+  increasing. Client frames arrive at the display / camera rate, irregularly
+  spaced.
+
+The track is resampled onto the TARGET_FPS timeline the video path uses, so
+everything downstream (swing window, features, model) sees the same kind of
+PoseSequence as after server-side extraction.
+"""
+
+from __future__ import annotations
+
+import json
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+import services.config as config
+from pipeline.types import PoseSequence
+
+NUM_LANDMARKS = 33
+
+
+def load_landmark_track(path: Path) -> Tuple[np.ndarray, np.ndarray]:
+    """(landmarks (T,33,4) float32, timestamps (T,) float64) from a track file."""
+    path = Path(path)
+    if path.suffix.lower() == ".npz":
+        with np.load(path) as track:
+            landmarks = track["landmarks"]
+            timestamps = track["timestamps"]
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            track = json.load(f)
+        landmarks = track["landmarks"]
+        timestamps = track["timestamps"]
+
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    if landmarks.ndim != 3 or landmarks.shape[1:] != (NUM_LANDMARKS, 4):
+        raise ValueError(
+            f"landmarks must have shape (T, {NUM_LANDMARKS}, 4), "
+            f"got {landmarks.shape}"
+        )
+    if len(landmarks) == 0:
+        raise ValueError("landmark track has no frames")
+    if timestamps.shape != (len(landmarks),):
+        raise ValueError(
+            f"timestamps must have shape ({len(landmarks)},), got {timestamps.shape}"
+        )
+    if timestamps[0] < 0:
+        raise ValueError("timestamps must be >= 0")
+    if len(timestamps) > 1 and np.any(np.diff(timestamps) <= 0):
+        raise ValueError("timestamps must be strictly increasing")
+    return landmarks, timestamps
+
+
+def track_to_sequence(
+    landmarks: np.ndarray,
+    timestamps: np.ndarray,
+    target_fps: float = config.TARGET_FPS,
+    max_gap_s: float = config.LANDMARK_TRACK_MAX_GAP_S,
+) -> PoseSequence:
+    """Resample a client track (at least one frame) onto the target_fps timeline.
+
+    Output frame n takes the track frame nearest in time to n / target_fps.
+    Nearest-sample keeps the raw landmark values, like the video path,
+    instead of blending detections into frames that never existed; a track
+    slower than target_fps repeats frames so the output timeline still runs
+    at real speed. Output frames with no track frame within max_gap_s (before
+    tracking started, or while the client dropped frames) have no pose.
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    times = np.asarray(timestamps, dtype=np.float64)
+    num_frames = int(np.floor(times[-1] * target_fps + 1e-6)) + 1
+    sample_times = np.arange(num_frames, dtype=np.float64) / target_fps
+
+    # Nearest track frame: the one after each sample time, or the one before
+    # when that is closer.
+    after = np.searchsorted(times, sample_times).clip(max=len(times) - 1)
+    before = (after - 1).clip(min=0)
+    nearest = np.where(
+        sample_times - times[before] <= times[after] - sample_times, before, after
+    )
+
+    data = landmarks[nearest]
+    missing = ~np.isfinite(data).all(axis=(1, 2))
+    missing |= np.abs(times[nearest] - sample_times) > max_gap_s
+    data[missing] = 0.0
+    valid_mask = np.any(data != 0.0, axis=(1, 2))
+
+    return PoseSequence(
+        data=data,
+        frame_times=np.arange(num_frames, dtype=np.float32) / max(target_fps, 1e-3),
+        fps=float(target_fps),
+        interpolation_mask=np.zeros((num_frames, NUM_LANDMARKS), dtype=bool),
+        valid_mask=valid_mask,
+    )
+
+
+def load_track_sequence(
+    path: Path, target_fps: float = config.TARGET_FPS
+) -> PoseSequence:
+    landmarks, timestamps = load_landmark_track(path)
+    return track_to_sequence(landmarks, timestamps, target_fps)
@@ -1,7 +1,19 @@
+import argparse
+import hashlib
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
+import services.config as config
+from services.feature_engineering import load_scaler
+from services.hashing import file_sha256
+
 
 class CoralLayer(nn.Module):
     def __init__(self, input_dim, num_classes):
@@ -98,14 +110,244 @@ class GolfSwingModel(nn.Module):
         return coral_logits, cls_logits
 
 
-def load_model(model_path):
-    model = GolfSwingModel()
-    state_dict = torch.load(model_path, map_location="cpu")
+def _read_checkpoint(model_path, mmap=False):
+    try:
+        return torch.load(model_path, map_location="cpu", mmap=mmap)
+    except RuntimeError:
+        # Legacy (non-zipfile) checkpoints cannot be memory-mapped.
+        if not mmap:
+            raise
+        return torch.load(model_path, map_location="cpu")
+
+
+def _read_state_dict(model_path, mmap=False):
+    state_dict = _read_checkpoint(model_path, mmap=mmap)
 
     # Handle if state_dict is inside a key (e.g. 'model_state_dict')
     if "model_state_dict" in state_dict:
         state_dict = state_dict["model_state_dict"]
+    return state_dict
+
+
+def is_scaler_fused(model_path=config.AI_MODEL_PATH):
+    """True if the checkpoint already applies the feature scaler internally."""
+    checkpoint = _read_checkpoint(model_path, mmap=True)
+    return bool(checkpoint.get("scaler_fused", False))
+
+
+def fold_scaler(model, scaler):
+    """Fold (x - mean) / std into the first Linear of joint_fc and global_mlp.
+
+    W @ ((x - m) / s) + b == (W / s) @ x + (b - W @ (m / s)). The joint input is
+    the (33, 13) feature grid flattened joint-major, so the 13 per-feature
+    statistics are tiled across the 33 joints. global_mlp sees the time-mean of
+    the global features, and the mean commutes with the affine scaler.
+    """
+    num_joints = model.joint_fc[0].in_features // config.POSE_JOINT_FEATURE_DIM
+    layers = [
+        (
+            model.joint_fc[0],
+            np.tile(scaler.joint_mean, num_joints),
+            np.tile(scaler.joint_std, num_joints),
+        ),
+        (model.global_mlp[0], scaler.global_mean, scaler.global_std),
+    ]
+    with torch.no_grad():
+        for linear, mean, std in layers:
+            mean = torch.from_numpy(mean.astype(np.float64))
+            std = torch.from_numpy(std.astype(np.float64))
+            weight = linear.weight.double()
+            bias = linear.bias.double() - weight @ (mean / std)
+            linear.weight.copy_(weight / std)
+            linear.bias.copy_(bias)
+    return model
+
+
+def write_scaler_fused_checkpoint(
+    out_path, model_path=config.AI_MODEL_PATH, scaler=None
+):
+    """Save a checkpoint whose input layers include the feature scaler."""
+    if scaler is None:
+        scaler = load_scaler()
+    if scaler is None:
+        raise RuntimeError("No feature scaler found to fuse into the model")
+    if is_scaler_fused(model_path):
+        raise RuntimeError(f"{model_path} already has a fused scaler")
 
-    model.load_state_dict(state_dict)
+    model = fold_scaler(load_model(model_path, mmap=False), scaler)
+    torch.save(
+        {
+            "model_state_dict": model.state_dict(),
+            "scaler_fused": True,
+            # Kept for reference / un-fusing; serving does not read it.
+            "scaler": {
+                "joint_mean": scaler.joint_mean.tolist(),
+                "joint_std": scaler.joint_std.tolist(),
+                "global_mean": scaler.global_mean.tolist(),
+                "global_std": scaler.global_std.tolist(),
+                "version": scaler.version,
+            },
+        },
+        out_path,
+    )
+    return Path(out_path)
+
+
+def load_model(model_path=config.AI_MODEL_PATH, mmap=True):
+    """Build the eager model. With mmap, parameters stay backed by the file.
+
+    The checkpoint tensors are assigned in place of the freshly initialised
+    parameters instead of being copied into them, so forked/spawned workers
+    share the page cache rather than each holding a private copy.
+    """
+    state_dict = _read_state_dict(model_path, mmap=mmap)
+
+    model = GolfSwingModel()
+    model.load_state_dict(state_dict, assign=mmap)
     model.eval()
     return model
+
+
+def warm_up_model(model, runs=config.MODEL_WARMUP_RUNS, batch_size=1):
+    """Run dummy forward passes so kernel/graph initialisation (and the
+    TorchScript profiling executor) happens before the first real request."""
+    joint = torch.zeros(batch_size, config.N_FRAMES, 33 * config.POSE_JOINT_FEATURE_DIM)
+    global_ = torch.zeros(batch_size, config.N_FRAMES, config.POSE_GLOBAL_FEATURE_DIM)
+    with torch.no_grad():
+        for _ in range(runs):
+            model(joint, global_)
+    return model
+
+
+def _checkpoint_key(model_path):
+    # TorchScript archives are tied to the torch version that produced them.
+    key = f"{file_sha256(model_path)}:{torch.__version__}"
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+def compiled_artifact_paths(model_path):
+    model_path = Path(model_path)
+    key = _checkpoint_key(model_path)
+    cache_dir = model_path.parent / config.MODEL_CACHE_SUBDIR
+    stem = f"{model_path.stem}.{key}"
+    return cache_dir / f"{stem}.ts", cache_dir / f"{stem}.weights.pt"
+
+
+def export_compiled_artifact(model_path):
+    """Write the TorchScript graph and a bare, mmap-able state dict to the cache."""
+    script_path, weights_path = compiled_artifact_paths(model_path)
+    script_path.parent.mkdir(parents=True, exist_ok=True)
+
+    model = load_model(model_path, mmap=False)
+    scripted = torch.jit.script(model)
+
+    # Write under temporary names so concurrent workers never see a partial file.
+    tmp_suffix = f".{os.getpid()}.tmp"
+    tmp_weights = weights_path.with_name(weights_path.name + tmp_suffix)
+    tmp_script = script_path.with_name(script_path.name + tmp_suffix)
+    torch.save(model.state_dict(), tmp_weights)
+    scripted.save(str(tmp_script))
+    os.replace(tmp_weights, weights_path)
+    os.replace(tmp_script, script_path)
+    return script_path, weights_path
+
+
+def _rebind_parameters(module, state_dict):
+    buffer_names = {name for name, _ in module.named_buffers()}
+    for name, tensor in state_dict.items():
+        owner_path, _, leaf = name.rpartition(".")
+        owner = module
+        for part in owner_path.split(".") if owner_path else []:
+            owner = getattr(owner, part)
+        if name in buffer_names:
+            setattr(owner, leaf, tensor)
+        else:
+            setattr(owner, leaf, nn.Parameter(tensor, requires_grad=False))
+
+    # RNN modules (the BiLSTM) run on their _flat_weights list, which still
+    # holds the scripted module's own copies; point it at the rebound tensors.
+    for submodule in module.modules():
+        names = getattr(submodule, "_flat_weights_names", None)
+        if names:
+            submodule._flat_weights = [getattr(submodule, n) for n in names]
+
+
+def load_serving_model(model_path=config.AI_MODEL_PATH, warm_up=True):
+    """Load the cached TorchScript artifact for a checkpoint, exporting it on
+    first use. Weights are memory-mapped from the cached state dict and bound
+    into the scripted module in place of its private copy."""
+    script_path, weights_path = compiled_artifact_paths(model_path)
+    if not (script_path.exists() and weights_path.exists()):
+        export_compiled_artifact(model_path)
+
+    model = torch.jit.load(str(script_path), map_location="cpu")
+    state_dict = torch.load(
+        weights_path, map_location="cpu", mmap=True, weights_only=True
+    )
+    _rebind_parameters(model, state_dict)
+    model.eval()
+
+    if warm_up:
+        warm_up_model(model)
+    return model
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource  # Unix only; model_utils must import on Windows too
+
+        # ru_maxrss is a high-water mark (KiB on Linux, bytes on macOS)
+        scale = 2**20 if sys.platform == "darwin" else 2**10
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def benchmark_loading(model_path=config.AI_MODEL_PATH):
+    """Print load time / resident memory of the eager and serving loaders."""
+    loaders = [
+        ("eager (copy)", lambda: load_model(model_path, mmap=False)),
+        ("eager (mmap)", lambda: load_model(model_path, mmap=True)),
+        (
+            "torchscript (mmap, cached)",
+            lambda: load_serving_model(model_path, warm_up=False),
+        ),
+    ]
+    load_serving_model(model_path, warm_up=False)  # make sure the cache exists
+
+    joint = torch.zeros(1, config.N_FRAMES, 33 * config.POSE_JOINT_FEATURE_DIM)
+    global_ = torch.zeros(1, config.N_FRAMES, config.POSE_GLOBAL_FEATURE_DIM)
+    for name, loader in loaders:
+        rss_before = _rss_mb()
+        t0 = time.perf_counter()
+        model = loader()
+        load_s = time.perf_counter() - t0
+        rss_after = _rss_mb()
+
+        t0 = time.perf_counter()
+        with torch.no_grad():
+            model(joint, global_)
+        first_s = time.perf_counter() - t0
+
+        print(
+            f"{name:28s} load {load_s * 1000:8.1f} ms  "
+            f"first forward {first_s * 1000:8.1f} ms  "
+            f"RSS +{rss_after - rss_before:6.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="GolfSwingModel loading utilities")
+    parser.add_argument("checkpoint", nargs="?", default=str(config.AI_MODEL_PATH))
+    parser.add_argument(
+        "--fuse-scaler",
+        metavar="OUT",
+        help="write a copy of the checkpoint with feature_scaler.json folded in",
+    )
+    args = parser.parse_args()
+
+    if args.fuse_scaler:
+        print(write_scaler_fused_checkpoint(args.fuse_scaler, args.checkpoint))
+    else:
+        benchmark_loading(args.checkpoint)
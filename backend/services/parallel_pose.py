@@ -0,0 +1,164 @@
+"""Multi-process pose extraction for long videos.
+
+A single PoseLandmarker in VIDEO mode is sequential, so one video never uses
+more than one core for pose. ParallelPoseExtractor splits the resampled
+timeline into chunks and runs them in a process pool, each worker process
+with its own landmarker.
+
+- Frames are downscaled to the landmarker input size in the parent and handed
+  to the workers through multiprocessing.shared_memory (one block per chunk),
+  never pickled.
+- Every chunk after the first starts overlap_frames early. Those warm-up
+  frames let the worker's tracker lock on before the chunk's own frames and
+  are dropped when the chunks are stitched back together, which hides the
+  tracking reset at each boundary.
+"""
+
+from __future__ import annotations
+
+import collections
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import services.config as config
+from pipeline.types import PoseSequence
+from services.pose_processing import PoseProcessor
+from services.video_io import resize_long_side
+
+_worker_processor: Optional[PoseProcessor] = None
+
+
+def _init_worker(model_path: str, input_long_side: Optional[int]) -> None:
+    global _worker_processor
+    _worker_processor = PoseProcessor(
+        input_long_side=input_long_side, model_path=Path(model_path)
+    )
+
+
+def _extract_chunk(
+    shm_name: str, shape: Tuple[int, ...], fps: float
+) -> Tuple[np.ndarray, np.ndarray]:
+    # Pool workers share the parent's resource tracker, so attaching here
+    # does not take ownership; the parent unlinks the block.
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        frames = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        sequence = _worker_processor.extract_sequence(frames, fps)
+        del frames
+        return sequence.data, sequence.valid_mask
+    finally:
+        shm.close()
+
+
+class ParallelPoseExtractor:
+    def __init__(
+        self,
+        workers: int = config.PARALLEL_POSE_WORKERS,
+        chunk_frames: int = config.PARALLEL_POSE_CHUNK_FRAMES,
+        overlap_frames: int = config.PARALLEL_POSE_OVERLAP_FRAMES,
+        input_long_side: Optional[int] = config.POSE_INPUT_LONG_SIDE,
+        model_path: Path = config.POSE_MODEL_PATH,
+        start_method: str = config.PARALLEL_POSE_START_METHOD,
+    ) -> None:
+        self.workers = max(1, int(workers))
+        self.chunk_frames = max(1, int(chunk_frames))
+        self.overlap_frames = max(0, int(overlap_frames))
+        self.input_long_side = input_long_side
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(str(model_path), input_long_side),
+        )
+
+    def close(self) -> None:
+        self.pool.shutdown(wait=True)
+
+    def extract_sequence(
+        self,
+        frames: Iterable[np.ndarray],
+        fps: float,
+        fallback: Optional[PoseProcessor] = None,
+    ) -> PoseSequence:
+        """Same result layout as PoseProcessor.extract_sequence().
+
+        Videos that fit in a single chunk run on fallback (in this process)
+        when one is given.
+        """
+        chunks: List[Tuple[int, Future, shared_memory.SharedMemory]] = []
+        in_flight = collections.deque()
+        buffer: List[np.ndarray] = []
+        warm_up = 0  # leading frames of the buffered chunk to drop
+
+        try:
+            for frame in frames:
+                buffer.append(resize_long_side(frame, self.input_long_side))
+                if len(buffer) == warm_up + self.chunk_frames:
+                    # Bound the memory held in shared blocks to a few chunks.
+                    while len(in_flight) >= 2 * self.workers:
+                        self._release(chunks[in_flight.popleft()])
+                    chunks.append((warm_up, *self._submit(buffer, fps)))
+                    in_flight.append(len(chunks) - 1)
+                    buffer = buffer[len(buffer) - self.overlap_frames :]
+                    warm_up = len(buffer)
+
+            if len(buffer) > warm_up:
+                if not chunks and fallback is not None:
+                    return fallback.extract_sequence(buffer, fps)
+                chunks.append((warm_up, *self._submit(buffer, fps)))
+            buffer = []
+
+            datas, valids = [], []
+            for skip, future, _ in chunks:
+                data, valid = future.result()
+                datas.append(data[skip:])
+                valids.append(valid[skip:])
+        finally:
+            for chunk in chunks:
+                self._release(chunk)
+
+        num_frames = sum(len(data) for data in datas)
+        return PoseSequence(
+            data=(
+                np.concatenate(datas)
+                if datas
+                else np.zeros((0, 33, 4), dtype=np.float32)
+            ),
+            frame_times=np.arange(num_frames, dtype=np.float32) / max(fps, 1e-3),
+            fps=float(fps),
+            interpolation_mask=np.zeros((num_frames, 33), dtype=bool),
+            valid_mask=(
+                np.concatenate(valids) if valids else np.zeros(0, dtype=bool)
+            ),
+        )
+
+    def _submit(
+        self, frames: List[np.ndarray], fps: float
+    ) -> Tuple[Future, shared_memory.SharedMemory]:
+        shape = (len(frames),) + frames[0].shape
+        shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)))
+        block = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+        for i, frame in enumerate(frames):
+            block[i] = frame
+        del block
+        return self.pool.submit(_extract_chunk, shm.name, shape, fps), shm
+
+    @staticmethod
+    def _release(chunk) -> None:
+        """Wait for a chunk's worker, then free its shared block (idempotent)."""
+        _, future, shm = chunk
+        try:
+            future.exception()
+        except Exception:
+            pass
+        if shm.buf is not None:
+            shm.close()
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
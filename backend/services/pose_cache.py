@@ -0,0 +1,137 @@
+"""Content-addressed on-disk cache of raw pose sequences.
+
+Pose extraction is the most expensive stage of an analysis, and the same clip
+is often analysed again (re-uploads, re-runs after a model or scaler change).
+Entries are keyed by the video bytes, the pose model file(s) and the decode /
+extraction settings, so any change to those produces a new key.
+
+Each entry is one uncompressed .npz (data, valid_mask, frame_times, fps plus
+small integer metadata). The directory is bounded by size: hits refresh an
+entry's mtime and the least recently used entries are evicted first.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+import services.config as config
+from pipeline.types import PoseSequence
+from services.hashing import file_sha256
+
+_MODEL_HASHES: Dict[Tuple[str, float, int], str] = {}
+_MODEL_HASH_LOCK = threading.Lock()
+
+
+def _model_hash(path: Path) -> str:
+    """sha256 of a model file, memoised on (path, mtime, size)."""
+    path = Path(path)
+    if not path.exists():
+        return "missing"
+    stat = path.stat()
+    memo_key = (str(path.resolve()), stat.st_mtime, stat.st_size)
+    with _MODEL_HASH_LOCK:
+        digest = _MODEL_HASHES.get(memo_key)
+    if digest is None:
+        digest = file_sha256(path)
+        with _MODEL_HASH_LOCK:
+            _MODEL_HASHES[memo_key] = digest
+    return digest
+
+
+class PoseCache:
+    def __init__(
+        self,
+        cache_dir: Path = config.POSE_CACHE_DIR,
+        max_bytes: int = config.POSE_CACHE_MAX_MB * 1024 * 1024,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._evict_lock = threading.Lock()
+
+    def key(
+        self, video_path: Path, model_paths: Sequence[Path], settings: Dict
+    ) -> str:
+        digest = hashlib.sha256()
+        digest.update(file_sha256(video_path).encode())
+        for model_path in model_paths:
+            digest.update(_model_hash(model_path).encode())
+        digest.update(json.dumps(settings, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.npz"
+
+    def get(self, key: str) -> Optional[Tuple[PoseSequence, Dict[str, int]]]:
+        """(sequence, metadata) for a cached entry, or None."""
+        path = self._path(key)
+        try:
+            with np.load(path) as entry:
+                meta = {
+                    name[len("meta_") :]: int(entry[name])
+                    for name in entry.files
+                    if name.startswith("meta_")
+                }
+                data = entry["data"]
+                sequence = PoseSequence(
+                    data=data,
+                    frame_times=entry["frame_times"],
+                    fps=float(entry["fps"]),
+                    interpolation_mask=np.zeros(data.shape[:2], dtype=bool),
+                    valid_mask=entry["valid_mask"],
+                )
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Ignoring unreadable pose cache entry {path.name}: {e}")
+            return None
+
+        try:
+            os.utime(path)  # LRU: mark as recently used
+        except OSError:
+            pass
+        return sequence, meta
+
+    def put(self, key: str, sequence: PoseSequence, **meta: int) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        path = self._path(key)
+        # Write under a temporary name so concurrent readers never see a
+        # partial entry.
+        tmp_path = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                data=sequence.data,
+                valid_mask=sequence.valid_mask,
+                frame_times=sequence.frame_times,
+                fps=np.float32(sequence.fps),
+                **{f"meta_{name}": np.int64(value) for name, value in meta.items()},
+            )
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self) -> None:
+        with self._evict_lock:
+            entries = []
+            for path in self.cache_dir.glob("*.npz"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
@@ -8,7 +8,8 @@ Key design:
 
 from __future__ import annotations
 
-from typing import Tuple
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple
 
 import cv2
 import numpy as np
@@ -19,30 +20,45 @@ from mediapipe.tasks.python import vision
 
 import services.config as config
 from pipeline.types import PoseSequence, QualityMetrics
+from services.video_io import resize_long_side
 
 
 class PoseProcessor:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        input_long_side: Optional[int] = config.POSE_INPUT_LONG_SIDE,
+        model_path: Path = config.POSE_MODEL_PATH,
+    ) -> None:
         self.landmarker = None
+        self.model_path = Path(model_path)
+        # Landmarks are normalised image coordinates, so the landmarker can run
+        # on a downscaled copy of each frame with no mapping back. Buffers are
+        # reused across frames (MPImage copies its input).
+        self.input_long_side = input_long_side
+        self._resize_buf = None
+        self._rgb_buf = None
+        # VIDEO running mode requires monotonically increasing timestamps for the
+        # lifetime of a landmarker, so consecutive videos are laid out one after
+        # another on a single timeline when the landmarker is reused.
+        self._timestamp_offset_us = 0
 
     def reset(self) -> None:
         if self.landmarker is not None:
             self.landmarker.close()
             self.landmarker = None
+        self._timestamp_offset_us = 0
 
     def _get_landmarker(self):
         if self.landmarker is not None:
             return self.landmarker
 
-        if not config.POSE_MODEL_PATH.exists():
+        if not self.model_path.exists():
             raise RuntimeError(
-                f"Pose model not found at {config.POSE_MODEL_PATH}. "
-                "Please download pose_landmarker_full.task manually."
+                f"Pose model not found at {self.model_path}. "
+                f"Please download {self.model_path.name} manually."
             )
 
-        base_options = mp_python.BaseOptions(
-            model_asset_path=str(config.POSE_MODEL_PATH)
-        )
+        base_options = mp_python.BaseOptions(model_asset_path=str(self.model_path))
         options = vision.PoseLandmarkerOptions(
             base_options=base_options,
             running_mode=vision.RunningMode.VIDEO,
@@ -54,37 +70,68 @@ class PoseProcessor:
         self.landmarker = vision.PoseLandmarker.create_from_options(options)
         return self.landmarker
 
-    def extract_sequence(self, frames: list[np.ndarray], fps: float) -> PoseSequence:
-        num_frames = len(frames)
-        pose_array = np.zeros((num_frames, 33, 4), dtype=np.float32)
-        interpolation_mask = np.zeros((num_frames, 33), dtype=bool)
-        valid_mask = np.zeros(num_frames, dtype=bool)
+    def _landmarker_input(self, frame: np.ndarray) -> np.ndarray:
+        small = resize_long_side(frame, self.input_long_side, dst=self._resize_buf)
+        if small is not frame:
+            self._resize_buf = small
+        if self._rgb_buf is None or self._rgb_buf.shape != small.shape:
+            self._rgb_buf = np.empty_like(small)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
+
+    def extract_sequence(
+        self,
+        frames: Iterable[np.ndarray],
+        fps: float,
+        on_pose: Optional[Callable[[np.ndarray, bool], bool]] = None,
+    ) -> PoseSequence:
+        """Run the landmarker over frames (a list or a lazy frame iterator).
+
+        Frames are consumed one at a time, so a streaming source is never
+        materialised. on_pose(pose, valid) is called after every frame; when
+        it returns True extraction stops there and the frame iterator is
+        closed, which stops the decoder too.
+        """
+        poses: List[np.ndarray] = []
+        valid: List[bool] = []
 
+        frame_dt_us = 1_000_000 / max(fps, 1e-3)
         for idx, frame in enumerate(frames):
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            rgb = self._landmarker_input(frame)
             mp_image = MPImage(image_format=ImageFormat.SRGB, data=rgb)
 
-            timestamp_us = int(idx * 1_000_000 / max(fps, 1e-3))
+            timestamp_us = self._timestamp_offset_us + int(idx * frame_dt_us)
             result = self._get_landmarker().detect_for_video(mp_image, timestamp_us)
 
-            if not result.pose_landmarks:
-                continue
-
-            landmarks = result.pose_landmarks[0]
-            for j, lm in enumerate(landmarks):
-                pose_array[idx, j, 0] = lm.x
-                pose_array[idx, j, 1] = lm.y
-                pose_array[idx, j, 2] = lm.z
-                pose_array[idx, j, 3] = lm.visibility
-            valid_mask[idx] = True
-
+            pose = np.zeros((33, 4), dtype=np.float32)
+            if result.pose_landmarks:
+                landmarks = result.pose_landmarks[0]
+                for j, lm in enumerate(landmarks):
+                    pose[j, 0] = lm.x
+                    pose[j, 1] = lm.y
+                    pose[j, 2] = lm.z
+                    pose[j, 3] = lm.visibility
+            poses.append(pose)
+            valid.append(bool(result.pose_landmarks))
+            if on_pose is not None and on_pose(pose, valid[-1]):
+                close = getattr(frames, "close", None)
+                if close is not None:
+                    close()
+                break
+
+        num_frames = len(poses)
+        # Leave a one-second gap before the next video on a reused landmarker.
+        self._timestamp_offset_us += int(num_frames * frame_dt_us) + 1_000_000
+
+        pose_array = (
+            np.stack(poses) if poses else np.zeros((0, 33, 4), dtype=np.float32)
+        )
         frame_times = np.arange(num_frames, dtype=np.float32) / max(fps, 1e-3)
         return PoseSequence(
             data=pose_array,
             frame_times=frame_times,
             fps=float(fps),
-            interpolation_mask=interpolation_mask,
-            valid_mask=valid_mask,
+            interpolation_mask=np.zeros((num_frames, 33), dtype=bool),
+            valid_mask=np.array(valid, dtype=bool),
         )
 
     # ---------- PATH A: for swing window detection ----------
@@ -152,104 +199,38 @@ class PoseProcessor:
         return processed, quality
 
     def _interpolate(self, data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
-        pose = data.copy()
-        vis = pose[:, :, 3]
-        ok = vis >= config.THRESHOLDS["pose_visibility"]
-
-        interp_mask = np.zeros_like(ok, dtype=bool)
-
-        for joint in range(pose.shape[1]):
-            valid_idx = np.where(ok[:, joint])[0]
-            missing_idx = np.where(~ok[:, joint])[0]
-            if valid_idx.size < 2:
-                if missing_idx.size > 0:
-                    interp_mask[missing_idx, joint] = (
-                        True  # Flag missing-hard joints for downstream exclusion
-                    )
-                    pose[missing_idx, joint, 3] = 0.0
-                continue
-            if missing_idx.size == 0:
-                continue
-            for dim in range(3):
-                series = pose[:, joint, dim]
-                series[missing_idx] = np.interp(
-                    missing_idx, valid_idx, series[valid_idx]
-                )
-                pose[:, joint, dim] = series
-
-            pose[missing_idx, joint, 3] = config.THRESHOLDS["pose_visibility"]
-            interp_mask[missing_idx, joint] = True
-
-        return pose, interp_mask
+        return interpolate_poses(data)
 
     def _smooth(self, data: np.ndarray) -> np.ndarray:
-        try:
-            from scipy.signal import savgol_filter
-
-            window = min(11, data.shape[0] - (1 - data.shape[0] % 2))
-            if window < 5:
-                return data
-            poly = 3 if window >= 5 else 1
-            return savgol_filter(data, window_length=window, polyorder=poly, axis=0)
-        except Exception:
-            kernel = np.ones((5,), dtype=np.float32) / 5.0
-            smoothed = data.copy()
-            for joint in range(data.shape[1]):
-                for dim in range(data.shape[2]):
-                    smoothed[:, joint, dim] = np.convolve(
-                        data[:, joint, dim], kernel, mode="same"
-                    )
-            return smoothed
+        return smooth_poses(data)
 
     def _spatial_normalize(self, data: np.ndarray) -> np.ndarray:
-        normalized = data.copy()
-        for t in range(normalized.shape[0]):
-            frame = normalized[t]
-
-            left_hip = frame[23, :3]
-            right_hip = frame[24, :3]
-            mid_hip = (left_hip + right_hip) / 2
-            frame[:, :3] -= mid_hip
-
-            hip_width = np.linalg.norm(right_hip - left_hip)
-            if hip_width < 1e-4:
-                shoulder_width = np.linalg.norm(frame[12, :3] - frame[11, :3])
-                hip_width = shoulder_width if shoulder_width > 1e-4 else 1.0
-            frame[:, :3] /= hip_width
-
-            hip_vec = frame[24, :2] - frame[23, :2]
-            hip_angle = np.arctan2(hip_vec[1], hip_vec[0])
-            cos_a, sin_a = np.cos(-hip_angle), np.sin(-hip_angle)
-            rot = np.array([[cos_a, -sin_a], [sin_a, cos_a]], dtype=np.float32)
-            frame[:, :2] = frame[:, :2] @ rot.T
-
-            mid_shoulder = (frame[11, :2] + frame[12, :2]) / 2
-            if mid_shoulder[1] < 0:
-                frame[:, 1] *= -1
-                frame[:, 2] *= -1
-
-        return normalized
+        return spatial_normalize_poses(data)
 
     def _temporal_resample(self, data: np.ndarray, target_frames: int) -> np.ndarray:
-        num_frames = data.shape[0]
-        if num_frames == target_frames:
-            return data
-
-        src_x = np.linspace(0, 1, num_frames)
-        dst_x = np.linspace(0, 1, target_frames)
-
-        out = np.zeros((target_frames, data.shape[1], data.shape[2]), dtype=np.float32)
-        for joint in range(data.shape[1]):
-            for dim in range(data.shape[2]):
-                out[:, joint, dim] = np.interp(dst_x, src_x, data[:, joint, dim])
-        return out
+        return temporal_resample_poses(data, target_frames)
 
     def _resample_mask(self, mask: np.ndarray, target_frames: int) -> np.ndarray:
-        num_frames = mask.shape[0]
+        num_frames = mask.shape[-2]
         if num_frames == target_frames:
             return mask
         src_idx = np.linspace(0, num_frames - 1, target_frames).astype(int)
-        return mask[src_idx]
+        return mask[..., src_idx, :]
+
+    def prepare_batch(
+        self, data: np.ndarray, target_frames: int = config.N_FRAMES
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """prepare_sequence() steps 1-6 for a stack of equal-length sequences.
+
+        data: (B, T, 33, 4) float32. Returns (poses (B, target_frames, 33, 4),
+        interpolation mask (B, target_frames, 33)); each row equals what
+        prepare_sequence() produces for that sequence.
+        """
+        padded, interp_mask = interpolate_poses(data)
+        smoothed = smooth_poses(padded)
+        normalized = spatial_normalize_poses(smoothed, out=smoothed)
+        resampled = temporal_resample_poses(normalized, target_frames)
+        return resampled, self._resample_mask(interp_mask, target_frames)
 
     def _quality_metrics(
         self, data: np.ndarray, interp_mask: np.ndarray
@@ -289,3 +270,180 @@ class PoseProcessor:
             else:
                 cur = 0
         return longest
+
+
+# ---------- Vectorised kernels ----------
+# Each accepts one sequence (T, 33, C) or a stack (B, T, 33, C) and works on
+# the whole array at once. Results are float32 and equal to the former
+# per-joint / per-frame loops; `out` (same shape, float32) is reused when
+# given and may be the input itself.
+
+
+def _as_batch(data: np.ndarray) -> Tuple[np.ndarray, bool]:
+    return (data[None], True) if data.ndim == 3 else (data, False)
+
+
+def _copy_into(data: np.ndarray, out: Optional[np.ndarray]) -> np.ndarray:
+    if out is None:
+        return data.astype(np.float32, copy=True)
+    if out is not data:
+        np.copyto(out, data)
+    return out
+
+
+def interpolate_poses(
+    data: np.ndarray, out: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Fill low-visibility joints by linear interpolation over time.
+
+    Joints with < 2 visible frames are not filled; their missing frames get
+    visibility 0. Filled points get visibility = the pose_visibility
+    threshold. Returns (poses, interpolation_mask (..., T, 33)).
+    """
+    threshold = config.THRESHOLDS["pose_visibility"]
+    pose = _copy_into(data, out)
+    batch, single = _as_batch(pose)
+    B, T, J, _ = batch.shape
+
+    ok = batch[..., 3] >= threshold  # (B, T, J)
+    missing = ~ok
+    enough = ok.sum(axis=1, keepdims=True) >= 2
+    hard = missing & ~enough
+    fill = missing & enough
+
+    batch[..., 3][hard] = 0.0
+
+    if fill.any():
+        frames = np.arange(T)[None, :, None]
+        prev = np.maximum.accumulate(np.where(ok, frames, -1), axis=1)
+        nxt = np.minimum.accumulate(np.where(ok, frames, T)[:, ::-1], axis=1)[:, ::-1]
+
+        b, t, j = np.nonzero(fill)
+        p, n = prev[b, t, j], nxt[b, t, j]
+        left, right = p < 0, n >= T
+        inner = ~(left | right)
+
+        # Same arithmetic as np.interp (float64, slope * (x - x0) + y0).
+        values = np.empty((len(b), 3), dtype=np.float64)
+        values[left] = batch[b[left], n[left], j[left], :3]
+        values[right] = batch[b[right], p[right], j[right], :3]
+        bi, ti, ji, pi, ni = b[inner], t[inner], j[inner], p[inner], n[inner]
+        y0 = batch[bi, pi, ji, :3].astype(np.float64)
+        y1 = batch[bi, ni, ji, :3].astype(np.float64)
+        slope = (y1 - y0) / (ni - pi).astype(np.float64)[:, None]
+        values[inner] = slope * (ti - pi).astype(np.float64)[:, None] + y0
+
+        batch[b, t, j, :3] = values
+        batch[b, t, j, 3] = threshold
+
+    return pose, (missing[0] if single else missing)
+
+
+def smooth_poses(data: np.ndarray) -> np.ndarray:
+    """Savitzky-Golay along time (window <= 11, cubic); 5-tap mean without scipy."""
+    axis = data.ndim - 3
+    num_frames = data.shape[axis]
+    try:
+        from scipy.signal import savgol_filter
+
+        window = min(11, num_frames - (1 - num_frames % 2))
+        if window < 5:
+            return data
+        poly = 3 if window >= 5 else 1
+        return savgol_filter(data, window_length=window, polyorder=poly, axis=axis)
+    except Exception:
+        # np.convolve(series, 5-tap box, mode="same") for every series at once.
+        kernel = np.ones((5,), dtype=np.float32) / 5.0
+        batch, single = _as_batch(data)
+        padded = np.zeros(
+            (batch.shape[0], num_frames + 4) + batch.shape[2:], dtype=np.float32
+        )
+        padded[:, 2:-2] = batch
+        smoothed = np.zeros(batch.shape, dtype=np.float32)
+        for k in range(5):
+            smoothed += padded[:, k : k + num_frames] * kernel[k]
+        if num_frames >= 5:
+            # np.convolve sums the truncated edge windows as (contiguous) dot
+            # products, which round differently from the running sum above.
+            series = np.moveaxis(batch, 1, -1)[..., None, :]
+            edges = ((0, slice(0, 3)), (1, slice(0, 4)))
+            edges += ((-2, slice(-4, None)), (-1, slice(-3, None)))
+            for t, window in edges:
+                taps = kernel[: 3 if t in (0, -1) else 4, None]
+                smoothed[:, t] = np.matmul(
+                    np.ascontiguousarray(series[..., window]), taps
+                )[..., 0, 0]
+        return smoothed[0] if single else smoothed
+
+
+def _vector_norm(vectors: np.ndarray) -> np.ndarray:
+    # Row-wise dot products via matmul round like np.linalg.norm on a single
+    # vector; a sum of squares (or norm(axis=-1)) can differ in the last bit.
+    squared = np.matmul(vectors[..., None, :], vectors[..., :, None])
+    return np.sqrt(squared[..., 0, 0])
+
+
+def spatial_normalize_poses(
+    data: np.ndarray, out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Per frame: centre on mid-hip, scale by hip width (shoulder width as a
+    fallback), rotate the hip line onto the x axis and flip so the shoulders
+    are above the hips."""
+    pose = _copy_into(data, out)
+    batch, _ = _as_batch(pose)
+    xyz = batch[..., :3]
+
+    mid_hip = (batch[..., 23, :3] + batch[..., 24, :3]) / 2
+    xyz -= mid_hip[..., None, :]
+
+    hip_width = _vector_norm(batch[..., 24, :3] - batch[..., 23, :3])
+    shoulder_width = _vector_norm(batch[..., 12, :3] - batch[..., 11, :3])
+    fallback = np.where(shoulder_width > 1e-4, shoulder_width, np.float32(1.0))
+    hip_width = np.where(hip_width < 1e-4, fallback, hip_width)
+    xyz /= hip_width[..., None, None]
+
+    hip_vec = batch[..., 24, :2] - batch[..., 23, :2]
+    hip_angle = np.arctan2(hip_vec[..., 1], hip_vec[..., 0])
+    cos_a, sin_a = np.cos(-hip_angle), np.sin(-hip_angle)
+    rot_t = np.empty(hip_angle.shape + (2, 2), dtype=np.float32)  # rot.T
+    rot_t[..., 0, 0], rot_t[..., 0, 1] = cos_a, sin_a
+    rot_t[..., 1, 0], rot_t[..., 1, 1] = -sin_a, cos_a
+    batch[..., :2] = np.matmul(batch[..., :2], rot_t)
+
+    mid_shoulder_y = (batch[..., 11, 1] + batch[..., 12, 1]) / 2
+    flip = mid_shoulder_y < 0
+    batch[..., 1:3] *= np.where(flip, np.float32(-1.0), np.float32(1.0))[
+        ..., None, None
+    ]
+    return pose
+
+
+def temporal_resample_poses(
+    data: np.ndarray, target_frames: int, out: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Linearly resample the time axis to target_frames (np.interp on [0, 1])."""
+    batch, single = _as_batch(data)
+    num_frames = batch.shape[1]
+    if num_frames == target_frames:
+        return data
+
+    shape = (batch.shape[0], target_frames) + batch.shape[2:]
+    result = out[None] if (out is not None and single) else out
+    if result is None:
+        result = np.empty(shape, dtype=np.float32)
+
+    if num_frames == 1:
+        result[:] = batch[:, :1]
+        return result[0] if single else result
+
+    src_x = np.linspace(0, 1, num_frames)
+    dst_x = np.linspace(0, 1, target_frames)
+    lo = np.clip(np.searchsorted(src_x, dst_x, side="right") - 1, 0, num_frames - 2)
+    x0 = src_x[lo][None, :, None, None]
+    dx = (src_x[lo + 1] - src_x[lo])[None, :, None, None]
+    y0 = batch[:, lo].astype(np.float64)
+    slope = (batch[:, lo + 1] - y0) / dx
+    np.copyto(result, slope * (dst_x[None, :, None, None] - x0) + y0, casting="unsafe")
+    # np.interp returns the last sample exactly at x == 1.
+    result[:, dst_x >= src_x[-1]] = batch[:, -1:]
+    return result[0] if single else result
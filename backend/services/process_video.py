@@ -1,25 +1,29 @@
 import sys
 import os
+import itertools
 import json
-import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import traceback
 
 import cv2
 import numpy as np
-import torch
-import mediapipe as mp
-from mediapipe.tasks import python
-from mediapipe.tasks.python import vision
 
 # Import local modules
 try:
     import services.config as config
-    from services.feature_engineering import FeatureEngineer
-    from services.model_utils import load_model
-    from pipeline.types import PoseSequence
+    from services.feature_engineering import FeatureEngineer, load_scaler
+    from services.inference_backend import create_backend
+    from services.inference_batcher import InferenceBatcher
+    from services.landmark_track import load_track_sequence
+    from pipeline.types import PoseSequence, SwingWindow
+    from services.parallel_pose import ParallelPoseExtractor
+    from services.pose_cache import PoseCache
     from services.pose_processing import PoseProcessor
-    from services.video_processing import VideoProcessor
+    from services.staged_pipeline import iter_stages, prefetch
+    from services.video_io import create_encoder
+    from services.video_processing import OnlineSwingDetector, VideoProcessor
 except ImportError as e:
     print(f"Error importing modules: {e}")
     sys.exit(1)
@@ -92,11 +96,8 @@ def calculate_angle(a, b, c):
     return 360 - angle if angle > 180.0 else angle
 
 
-def draw_landmarks_from_array(rgb_image, landmarks):
-    annotated_image = np.copy(rgb_image)
-    h, w, _ = annotated_image.shape
-
-    connections = [
+POSE_CONNECTIONS = np.array(
+    [
         (0, 1),
         (1, 2),
         (2, 3),
@@ -132,269 +133,966 @@ def draw_landmarks_from_array(rgb_image, landmarks):
         (30, 32),
         (27, 31),
         (28, 32),
-    ]
-
-    px_landmarks = [(int(lm[0] * w), int(lm[1] * h)) for lm in landmarks]
-    joint_colors = [(67, 70, 0)] * len(px_landmarks)
+    ],
+    dtype=np.intp,
+)
+
+SKELETON_COLOR = (96, 188, 249)
+JOINT_COLOR = (67, 70, 0)
+HEAD_COLOR = (255, 0, 255)
+ARM_OK_COLOR = (0, 255, 0)
+ARM_BENT_COLOR = (0, 0, 255)
+ARM_JOINTS = np.array([11, 13, 15], dtype=np.intp)
+OTHER_JOINTS = np.array(
+    [j for j in range(1, 33) if j not in (11, 13, 15)], dtype=np.intp
+)
+
+
+class OverlayRenderer:
+    """Draws the skeleton overlay for a whole pose sequence.
+
+    Pixel coordinates and the left-arm colour (straight arm > 160 degrees)
+    are computed for every frame in one NumPy pass per frame size; draw()
+    then only issues a handful of batched cv2.polylines calls, in place.
+    Filled joint circles are drawn as zero-length polylines (thickness
+    2 * radius produces the same disc as cv2.circle).
+    """
 
-    if len(px_landmarks) > 15:
-        left_arm_angle = calculate_angle(
-            px_landmarks[11], px_landmarks[13], px_landmarks[15]
+    def __init__(self, landmarks):
+        self.landmarks = np.asarray(landmarks)  # (T, 33, >=2) normalised coords
+        self._size = None
+        self._px = None
+        self._arm_ok = None
+
+    def _project(self, width, height):
+        if self._size == (width, height):
+            return
+        xy = self.landmarks[:, :, :2] * np.array([width, height], dtype=np.float32)
+        px = xy.astype(np.int32)  # truncates like int()
+
+        # Left elbow angle (shoulder 11, elbow 13, wrist 15) for all frames.
+        a, b, c = px[:, 11], px[:, 13], px[:, 15]
+        radians = np.arctan2(c[:, 1] - b[:, 1], c[:, 0] - b[:, 0]) - np.arctan2(
+            a[:, 1] - b[:, 1], a[:, 0] - b[:, 0]
         )
-        status_color = (0, 255, 0) if left_arm_angle > 160 else (0, 0, 255)
-        for idx in [11, 13, 15]:
-            joint_colors[idx] = status_color
-
-    if px_landmarks:
-        joint_colors[0] = (255, 0, 255)
-
-    for start, end in connections:
-        if start < len(px_landmarks) and end < len(px_landmarks):
-            cv2.line(
-                annotated_image,
-                px_landmarks[start],
-                px_landmarks[end],
-                (96, 188, 249),
-                3,
-            )
+        angle = np.abs(radians * 180.0 / np.pi)
+        angle = np.where(angle > 180.0, 360 - angle, angle)
+
+        self._size = (width, height)
+        self._px = px
+        self._arm_ok = angle > 160
+
+    def draw(self, frame, i):
+        """Draw frame i's skeleton into frame (modified in place) and return it."""
+        h, w = frame.shape[:2]
+        self._project(w, h)
+        px = self._px[i]
+
+        cv2.polylines(frame, list(px[POSE_CONNECTIONS]), False, SKELETON_COLOR, 3)
+
+        arm_color = ARM_OK_COLOR if self._arm_ok[i] else ARM_BENT_COLOR
+        for joints, color in (
+            (OTHER_JOINTS, JOINT_COLOR),
+            (ARM_JOINTS, arm_color),
+            (np.array([0]), HEAD_COLOR),
+        ):
+            points = px[joints][:, None, :].repeat(2, axis=1)
+            cv2.polylines(frame, list(points), False, color, 12)
+        points = px[:, None, :].repeat(2, axis=1)
+        cv2.polylines(frame, list(points), False, (255, 255, 255), 4)
+        return frame
 
-    for i, (px, py) in enumerate(px_landmarks):
-        cv2.circle(annotated_image, (px, py), 6, joint_colors[i], -1)
-        cv2.circle(annotated_image, (px, py), 2, (255, 255, 255), -1)
 
-    return annotated_image
+def draw_landmarks_from_array(rgb_image, landmarks):
+    annotated_image = np.copy(rgb_image)
+    return OverlayRenderer(np.asarray(landmarks)[None]).draw(annotated_image, 0)
 
 
-def process_video(input_path, output_path):
-    print(f"Processing video: {input_path}")
+def render_state_path(output_path):
+    """Where a metrics-only run keeps what the deferred overlay render needs.
 
-    video_processor = VideoProcessor(target_fps=config.TARGET_FPS)
-    pose_processor = PoseProcessor()
-    feature_engineer = FeatureEngineer()
+    Keyed by the output video's file name, in RENDER_STATE_DIR rather than
+    next to the output, whose directory is served publicly.
+    """
+    return config.RENDER_STATE_DIR / (Path(output_path).name + ".overlay.npz")
+
+
+def save_render_state(output_path, pose_sequence, predicted_band):
+    path = render_state_path(output_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(
+        path,
+        data=pose_sequence.data,
+        valid_mask=pose_sequence.valid_mask,
+        fps=np.float32(pose_sequence.fps),
+        band=np.array(predicted_band),
+    )
 
-    model_path = os.path.join("ai_resources", "coral_ordinal_model_20260102_001311.pth")
-    ai_model = None
-    try:
-        ai_model = load_model(model_path)
-        print("AI Model loaded successfully")
-    except Exception as e:
-        print(f"Failed to load AI Model: {e}")
 
-    # 1. Load and Resample
-    try:
-        print("Loading and resampling video...")
-        video_clip = video_processor.load_and_resample(Path(input_path))
-    except Exception as e:
-        print(f"Error loading video: {e}")
-        sys.exit(1)
+def load_render_state(output_path):
+    path = render_state_path(output_path)
+    if not path.exists():
+        raise FileNotFoundError(
+            f"No saved analysis for {output_path}; run a metrics-only analysis first"
+        )
+    with np.load(path) as state:
+        data = state["data"]
+        num_frames = len(data)
+        fps = float(state["fps"])
+        pose_sequence = PoseSequence(
+            data=data,
+            frame_times=np.arange(num_frames, dtype=np.float32) / max(fps, 1e-3),
+            fps=fps,
+            interpolation_mask=np.zeros((num_frames, 33), dtype=bool),
+            valid_mask=state["valid_mask"],
+        )
+        return pose_sequence, str(state["band"])
+
+
+class SwingAnalyzer:
+    """Analysis pipeline that keeps its expensive state warm between videos.
 
-    # 2. Extract Pose
-    print("Extracting pose sequence...")
-    pose_sequence = pose_processor.extract_sequence(video_clip.frames, video_clip.fps)
+    The AI model, the feature scaler and the MediaPipe landmarker are created
+    once and reused for every call to analyze(), so a long-running worker only
+    pays the torch/mediapipe cold start a single time.
+
+    analyze() may run on several threads at once: each thread gets its own
+    PoseProcessor (landmarkers are not thread-safe), and with batching enabled
+    model calls from all threads are gathered by an InferenceBatcher.
+    """
+
+    def __init__(self, model_path=None, batching=False, load_model=True):
+        self.video_processor = VideoProcessor(target_fps=config.TARGET_FPS)
+        self.feature_engineer = FeatureEngineer()
+        self._local = threading.local()
+        self._pose_processors = []
+        self._pose_lock = threading.Lock()
+        self._parallel_pose = None
+
+        if model_path is None:
+            model_path = config.AI_MODEL_PATH
+        self.backend = None
+        if load_model:
+            try:
+                self.backend = create_backend(config.INFERENCE_BACKEND, model_path)
+                print(f"AI Model loaded successfully ({self.backend.name} backend)")
+            except Exception as e:
+                print(f"Failed to load AI Model: {e}")
 
-    # 3. Detect Swing Window
-    print("Detecting swing window...")
-    swing_window = video_processor.detect_swing_window(pose_sequence)
-    print(f"Swing window: {swing_window.start_frame} - {swing_window.end_frame}")
+        # Scaler-fused checkpoints standardise features inside the model; for
+        # legacy checkpoints the JSON scaler is cached in memory by load_scaler().
+        if self.backend is not None and not self.backend.scaler_fused:
+            try:
+                if load_scaler() is None:
+                    print("Warning: Scaler not found")
+            except Exception as e:
+                print(f"Scaler error: {e}")
+
+        self.pose_cache = PoseCache() if config.POSE_CACHE_ENABLED else None
+
+        self.batcher = None
+        if batching and self.backend is not None:
+            self.batcher = InferenceBatcher(self.backend)
+
+    def _thread_pose_processor(self, name, factory):
+        processor = getattr(self._local, name, None)
+        if processor is None:
+            processor = factory()
+            setattr(self._local, name, processor)
+            with self._pose_lock:
+                self._pose_processors.append(processor)
+        return processor
+
+    @property
+    def pose_processor(self):
+        return self._thread_pose_processor("pose_processor", PoseProcessor)
+
+    @property
+    def coarse_pose_processor(self):
+        return self._thread_pose_processor(
+            "coarse_pose_processor",
+            lambda: PoseProcessor(
+                input_long_side=config.COARSE_POSE_LONG_SIDE,
+                model_path=config.POSE_LITE_MODEL_PATH,
+            ),
+        )
 
-    # 4. AI Prediction & Metrics
-    predicted_band = "Unknown"
-    probs_str = ""
-    swing_speed_val = 0.0
-    arm_angle_val = 0.0
+    @property
+    def parallel_pose(self):
+        """Process pool shared by all analyze() threads, started on first use."""
+        with self._pose_lock:
+            if self._parallel_pose is None:
+                self._parallel_pose = ParallelPoseExtractor()
+            return self._parallel_pose
 
-    if ai_model:
+    def warm_up(self):
+        """Create the landmarker up front so the first job doesn't pay for it."""
         try:
-            print("Running AI analysis...")
+            self.pose_processor._get_landmarker()
+            if config.TWO_PASS_POSE:
+                self.coarse_pose_processor._get_landmarker()
+        except Exception as e:
+            print(f"Failed to create pose landmarker: {e}")
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+        with self._pose_lock:
+            if self._parallel_pose is not None:
+                self._parallel_pose.close()
+                self._parallel_pose = None
+            for processor in self._pose_processors:
+                processor.reset()
+
+    def analyze(self, input_path, output_path, render=True, landmarks_path=None):
+        """Analyze a swing video and write the annotated output video.
+
+        With render=False (metrics-only) the result is returned right after
+        inference; the poses and band are saved under RENDER_STATE_DIR so
+        that render() can produce the overlay video later.
+
+        With landmarks_path (a client landmark track, see landmark_track.py)
+        the track replaces server-side pose extraction; the video is only
+        decoded for the overlay.
+        """
+        print(f"Processing video: {input_path}")
+
+        # 1 - 2. Load and Resample, Extract Pose
+        video_clip = None
+        if landmarks_path is not None:
+            print("Loading client landmark track...")
+            pose_sequence = load_track_sequence(
+                Path(landmarks_path), self.video_processor.target_fps
+            )
+            refined_start = 0
+        else:
+            print("Loading and resampling video...")
+            video_clip = self._open_clip(input_path)
+            print("Extracting pose sequence...")
+            pose_sequence, refined_start = self._load_or_extract_poses(
+                input_path, video_clip
+            )
 
-            start, end = swing_window.start_frame, swing_window.end_frame
-            if end - start < 10:
-                start, end = 0, len(pose_sequence.data)
+        # 3 - 4. Swing Window, AI Prediction & Metrics
+        result = self._analyze_sequence(pose_sequence, refined_start)
 
-            sliced_seq = PoseSequence(
-                data=pose_sequence.data[start:end],
-                frame_times=pose_sequence.frame_times[start:end],
-                fps=pose_sequence.fps,
-                interpolation_mask=pose_sequence.interpolation_mask[start:end],
-                valid_mask=pose_sequence.valid_mask[start:end],
+        # 5. Draw Overlay & Export
+        if render:
+            print("Generating output video...")
+            if video_clip is None:
+                video_clip = self._open_clip(input_path)
+            self._render(video_clip, pose_sequence, result["band"], output_path)
+            print(f"Done! Saved to: {output_path}")
+        else:
+            save_render_state(output_path, pose_sequence, result["band"])
+            print("Done! Overlay rendering deferred.")
+
+        result["rendered"] = render
+        return result
+
+    def analyze_landmarks(self, landmarks_path):
+        """Analyze a client landmark track uploaded without a video.
+
+        Same result as analyze(), minus the overlay video.
+        """
+        print(f"Processing landmark track: {landmarks_path}")
+        pose_sequence = load_track_sequence(
+            Path(landmarks_path), self.video_processor.target_fps
+        )
+        result = self._analyze_sequence(pose_sequence)
+        result["rendered"] = False
+        return result
+
+    def analyze_swings(
+        self, input_path, output_path=None, on_swing=None, landmarks_path=None
+    ):
+        """Analyze every swing of a long recording (e.g. a range session).
+
+        One decode and pose pass for the whole video; all swings are scored in
+        one batched model call. on_swing(swing) is called with each swing's
+        result as soon as it is ready, before the overlay video is rendered
+        (only when output_path is given).
+        """
+        print(f"Processing session video: {input_path}")
+
+        video_clip = None
+        if landmarks_path is not None:
+            print("Loading client landmark track...")
+            pose_sequence = load_track_sequence(
+                Path(landmarks_path), self.video_processor.target_fps
+            )
+        else:
+            # Two-pass extraction only refines one swing; every swing needs
+            # full-quality poses here.
+            video_clip = self._open_clip(input_path)
+            print("Extracting pose sequence...")
+            pose_sequence, _ = self._load_or_extract_poses(
+                input_path, video_clip, two_pass=False, early_stop=False
             )
 
-            # Calculate Metrics (on non-resampled data)
+        print("Detecting swing windows...")
+        windows = self.video_processor.detect_swing_windows(pose_sequence)
+        print(f"Found {len(windows)} swing(s)")
+
+        swings = self._score_swings(pose_sequence, windows, on_swing)
+
+        rendered = output_path is not None
+        if rendered:
+            print("Generating output video...")
+            labels = [None] * len(pose_sequence.data)
+            for swing, window in zip(swings, windows):
+                if swing["band"] != "Unknown":
+                    label = f"Swing {swing['index'] + 1} - Band: {swing['band']}"
+                    labels[window.start_frame : window.end_frame] = [
+                        label
+                    ] * window.num_frames
+            if video_clip is None:
+                video_clip = self._open_clip(input_path)
+            self._render(
+                video_clip, pose_sequence, "Unknown", output_path, frame_labels=labels
+            )
+            print(f"Done! Saved to: {output_path}")
+
+        return {"swings": swings, "rendered": rendered}
+
+    def _score_swings(self, pose_sequence, windows, on_swing=None):
+        swings = [
+            {
+                "index": i,
+                "band": "Unknown",
+                "probs": "",
+                "swing_start": window.start_frame,
+                "swing_end": window.end_frame,
+                "confidence": window.confidence,
+                "swing_speed": 0.0,
+                "arm_angle": 0.0,
+            }
+            for i, window in enumerate(windows)
+        ]
+        if self.backend is None:
+            for swing in swings:
+                if on_swing is not None:
+                    on_swing(swing)
+            return swings
+
+        sliced_seqs = [
+            self._slice_sequence(pose_sequence, window.start_frame, window.end_frame)
+            for window in windows
+        ]
+
+        predictions = [("Unknown", "")] * len(swings)
+        if sliced_seqs:
             try:
-                metrics_data, _ = pose_processor._interpolate(sliced_seq.data)
-                metrics_data = pose_processor._smooth(metrics_data)
-                metrics_data = pose_processor._spatial_normalize(metrics_data)
-
-                metrics_seq = PoseSequence(
-                    data=metrics_data,
-                    frame_times=sliced_seq.frame_times,
-                    fps=sliced_seq.fps,
-                    interpolation_mask=sliced_seq.interpolation_mask,
-                    valid_mask=sliced_seq.valid_mask,
-                )
+                print(f"Running AI analysis on {len(sliced_seqs)} swing(s)...")
+                predictions = self._predict_batch(sliced_seqs)
+            except Exception as e:
+                print(f"AI Prediction Error: {e}")
+                traceback.print_exc()
+
+        for swing, sliced_seq, (band, probs_str) in zip(
+            swings, sliced_seqs, predictions
+        ):
+            swing["band"], swing["probs"] = band, probs_str
+            swing["swing_speed"], swing["arm_angle"] = self._compute_metrics(
+                sliced_seq
+            )
+            if on_swing is not None:
+                on_swing(swing)
+        return swings
+
+    @staticmethod
+    def _slice_sequence(pose_sequence, start, end):
+        return PoseSequence(
+            data=pose_sequence.data[start:end],
+            frame_times=pose_sequence.frame_times[start:end],
+            fps=pose_sequence.fps,
+            interpolation_mask=pose_sequence.interpolation_mask[start:end],
+            valid_mask=pose_sequence.valid_mask[start:end],
+        )
 
-                m_joint_feats, m_global_feats = feature_engineer.compute_features(
-                    metrics_seq
-                )
+    def _analyze_sequence(self, pose_sequence, refined_start=0):
+        # 3. Detect Swing Window
+        print("Detecting swing window...")
+        swing_window = self._detect_swing_window(pose_sequence, refined_start)
+        print(f"Swing window: {swing_window.start_frame} - {swing_window.end_frame}")
 
-                # Swing Speed: Hip Widths/s -> m/s (Approx 1 HW = 0.35m)
-                raw_speed = np.percentile(m_global_feats[:, 2], 95)
-                swing_speed_val = float(raw_speed * 0.35)
+        # 4. AI Prediction & Metrics
+        predicted_band = "Unknown"
+        probs_str = ""
+        swing_speed_val = 0.0
+        arm_angle_val = 0.0
+
+        if self.backend is not None:
+            try:
+                print("Running AI analysis...")
 
-                # Arm Angle
-                arm_angle_val = float(np.max(m_joint_feats[:, 13, 12]))
+                start, end = swing_window.start_frame, swing_window.end_frame
+                if end - start < 10:
+                    start, end = 0, len(pose_sequence.data)
 
+                sliced_seq = self._slice_sequence(pose_sequence, start, end)
+
+                swing_speed_val, arm_angle_val = self._compute_metrics(sliced_seq)
+
+                predicted_band, probs_str = self._predict(sliced_seq)
+                print(f"AI Result: Band {predicted_band}")
+
+            except Exception as e:
+                print(f"AI Prediction Error: {e}")
+                traceback.print_exc()
+
+        return {
+            "band": predicted_band,
+            "probs": probs_str,
+            "swing_start": swing_window.start_frame,
+            "swing_end": swing_window.end_frame,
+            "swing_speed": swing_speed_val,
+            "arm_angle": arm_angle_val,
+        }
+
+    def render(self, input_path, output_path):
+        """Render the overlay video for an earlier metrics-only analyze()."""
+        print(f"Rendering overlay: {input_path}")
+        pose_sequence, predicted_band = load_render_state(output_path)
+        video_clip = self._open_clip(input_path)
+        self._render(video_clip, pose_sequence, predicted_band, output_path)
+        os.remove(render_state_path(output_path))
+        print(f"Done! Saved to: {output_path}")
+        return {"rendered": True}
+
+    def _open_clip(self, input_path):
+        if config.STREAMING_DECODE:
+            return self.video_processor.open_stream(Path(input_path))
+        return self.video_processor.load_and_resample(Path(input_path))
+
+    def _load_or_extract_poses(
+        self, input_path, video_clip, two_pass=None, early_stop=None
+    ):
+        """(pose_sequence, refined_start), from the pose cache when possible.
+
+        refined_start is where full-quality poses begin (0 unless two-pass
+        extraction skipped the start of the video). two_pass and early_stop
+        override TWO_PASS_POSE and ONLINE_SWING_DETECTION; with early_stop
+        the sequence ends shortly after the swing.
+        """
+        if two_pass is None:
+            two_pass = config.TWO_PASS_POSE
+        if early_stop is None:
+            early_stop = config.ONLINE_SWING_DETECTION
+        if config.PARALLEL_POSE_WORKERS > 0 and not two_pass:
+            early_stop = False
+        key = None
+        if self.pose_cache is not None:
+            try:
+                key = self.pose_cache.key(
+                    Path(input_path),
+                    *self._pose_cache_settings(video_clip, two_pass, early_stop),
+                )
+                cached = self.pose_cache.get(key)
+            except OSError as e:
+                print(f"Pose cache unavailable: {e}")
+                key, cached = None, None
+            if cached is not None:
+                print("Pose cache hit, skipping pose extraction")
+                pose_sequence, meta = cached
+                return pose_sequence, meta.get("refined_start", 0)
+
+        if two_pass:
+            pose_sequence, refined_start = self._extract_two_pass(
+                input_path, video_clip, early_stop
+            )
+        elif config.PARALLEL_POSE_WORKERS > 0:
+            pose_sequence = self.parallel_pose.extract_sequence(
+                video_clip.iter_frames(), video_clip.fps, fallback=self.pose_processor
+            )
+            refined_start = 0
+        else:
+            detector = OnlineSwingDetector(video_clip.fps) if early_stop else None
+            pose_sequence = self._extract_poses(
+                self.pose_processor,
+                video_clip.iter_frames(),
+                video_clip.fps,
+                on_pose=detector.update if detector is not None else None,
+            )
+            refined_start = 0
+            if detector is not None and detector.finished:
                 print(
-                    f"Metrics: Speed={swing_speed_val:.2f} m/s, Angle={arm_angle_val:.1f}"
+                    "Swing over, stopped pose extraction at frame "
+                    f"{detector.num_frames}"
                 )
+        if len(pose_sequence.data) == 0:
+            raise RuntimeError(f"Video has no frames after resampling: {input_path}")
 
-            except Exception as e:
-                print(f"Error calculating metrics: {e}")
+        if key is not None:
+            try:
+                self.pose_cache.put(key, pose_sequence, refined_start=refined_start)
+            except OSError as e:
+                print(f"Failed to write pose cache: {e}")
+        return pose_sequence, refined_start
+
+    def _pose_cache_settings(self, video_clip, two_pass, early_stop):
+        """Pose model files and every setting that changes the extracted poses."""
+        model_paths = [config.POSE_MODEL_PATH]
+        settings = {
+            "fps": video_clip.fps,
+            "decoder": self.video_processor.decoder.name,
+            "pose_input_long_side": config.POSE_INPUT_LONG_SIDE,
+            "two_pass": two_pass,
+        }
+        if early_stop:
+            settings.update(
+                online_min_peak_speed=config.ONLINE_SWING_MIN_PEAK_SPEED,
+                online_settle_s=config.ONLINE_SWING_SETTLE_S,
+                padding=config.PADDING_MARGIN_FRAMES,
+                n_frames=config.N_FRAMES,
+                visibility=config.THRESHOLDS["pose_visibility"],
+            )
+        if config.PARALLEL_POSE_WORKERS > 0 and not two_pass:
+            # Chunk boundaries reset tracking, which can change poses slightly.
+            settings.update(
+                chunk_frames=config.PARALLEL_POSE_CHUNK_FRAMES,
+                overlap_frames=config.PARALLEL_POSE_OVERLAP_FRAMES,
+            )
+        if two_pass:
+            model_paths.append(config.POSE_LITE_MODEL_PATH)
+            settings.update(
+                coarse_fps=config.COARSE_POSE_FPS,
+                coarse_long_side=config.COARSE_POSE_LONG_SIDE,
+                padding=config.PADDING_MARGIN_FRAMES,
+                n_frames=config.N_FRAMES,
+                visibility=config.THRESHOLDS["pose_visibility"],
+            )
+        return model_paths, settings
 
-            # Prepare for AI (Normalize & Resample)
-            processed_seq, _ = pose_processor.prepare_sequence(sliced_seq)
-            joint_feats, global_feats = feature_engineer.compute_features(processed_seq)
+    def _detect_swing_window(self, pose_sequence, refined_start=0):
+        if refined_start == 0:
+            return self.video_processor.detect_swing_window(pose_sequence)
 
-            scaler_path = (
-                config.OUTPUT_ROOT
-                / config.FINAL_FEATURE_SUBDIR
-                / config.SCALER_FILENAME
+        # Only frames from refined_start on carry poses; detect there.
+        window = self.video_processor.detect_swing_window(
+            PoseSequence(
+                data=pose_sequence.data[refined_start:],
+                frame_times=pose_sequence.frame_times[refined_start:],
+                fps=pose_sequence.fps,
+                interpolation_mask=pose_sequence.interpolation_mask[refined_start:],
+                valid_mask=pose_sequence.valid_mask[refined_start:],
             )
-            if scaler_path.exists():
-                try:
-                    with open(scaler_path, "r") as f:
-                        scaler_data = json.load(f)
-
-                    j_mean = np.array(scaler_data["joint_mean"], dtype=np.float32)
-                    j_std = np.array(scaler_data["joint_std"], dtype=np.float32)
-                    g_mean = np.array(scaler_data["global_mean"], dtype=np.float32)
-                    g_std = np.array(scaler_data["global_std"], dtype=np.float32)
-
-                    j_std[j_std == 0] = 1.0
-                    g_std[g_std == 0] = 1.0
-
-                    joint_feats = (joint_feats - j_mean) / j_std
-                    global_feats = (global_feats - g_mean) / g_std
-                except Exception as e:
-                    print(f"Scaler error: {e}")
-            else:
-                print("Warning: Scaler not found")
+        )
+        return SwingWindow(
+            start_frame=window.start_frame + refined_start,
+            end_frame=window.end_frame + refined_start,
+            confidence=window.confidence,
+            method=window.method,
+        )
 
-            # Inference
-            T, J, D = joint_feats.shape
-            joint_tensor = torch.from_numpy(joint_feats.reshape(T, J * D)).unsqueeze(0)
-            global_tensor = torch.from_numpy(global_feats).unsqueeze(0)
+    def _extract_poses(self, pose_processor, frames, fps, on_pose=None):
+        if config.PIPELINED_EXECUTION:
+            # Decode the next frames while the landmarker runs on this one.
+            frames = prefetch(frames)
+        return pose_processor.extract_sequence(frames, fps, on_pose=on_pose)
+
+    def _extract_two_pass(self, input_path, video_clip, early_stop=False):
+        """Coarse pose pass over the whole video, full pass over the swing only.
+
+        Returns the pose sequence on the video_clip timeline and the start of
+        the refined range. The sequence ends with that range; frames before it
+        carry no pose (valid_mask False). With early_stop the coarse pass
+        ends once the swing is over.
+        """
+        coarse_clip = self.video_processor.open_stream(
+            Path(input_path),
+            long_side=config.COARSE_POSE_LONG_SIDE,
+            target_fps=config.COARSE_POSE_FPS,
+        )
+        scale = video_clip.fps / coarse_clip.fps
+        coarse_window_frames = max(1, int(round(config.N_FRAMES / scale)))
+        detector = None
+        if early_stop:
+            detector = OnlineSwingDetector(
+                coarse_clip.fps, window_frames=coarse_window_frames
+            )
+        coarse_seq = self._extract_poses(
+            self.coarse_pose_processor,
+            coarse_clip.iter_frames(),
+            coarse_clip.fps,
+            on_pose=detector.update if detector is not None else None,
+        )
+        if len(coarse_seq.data) == 0:
+            raise RuntimeError(f"Video has no frames after resampling: {input_path}")
+        if detector is not None and detector.finished:
+            print(f"Swing over, stopped coarse pass at frame {detector.num_frames}")
+
+        print("Detecting swing window (coarse)...")
+        coarse_window = self.video_processor.detect_swing_window(
+            coarse_seq, window_frames=coarse_window_frames
+        )
+        start = max(
+            0, int(coarse_window.start_frame * scale) - config.PADDING_MARGIN_FRAMES
+        )
+        end = int(np.ceil(coarse_window.end_frame * scale))
+        end = max(end + config.PADDING_MARGIN_FRAMES, start + config.N_FRAMES)
+        print(f"Refining poses on frames {start} - {end}")
+
+        fine_seq = self._extract_poses(
+            self.pose_processor,
+            itertools.islice(video_clip.iter_frames(), start, end),
+            video_clip.fps,
+        )
+        if len(fine_seq.data) == 0:
+            raise RuntimeError(f"No frames in the refined range: {input_path}")
+
+        num_frames = start + len(fine_seq.data)
+        data = np.zeros((num_frames, 33, 4), dtype=np.float32)
+        data[start:] = fine_seq.data
+        valid_mask = np.zeros(num_frames, dtype=bool)
+        valid_mask[start:] = fine_seq.valid_mask
+        pose_sequence = PoseSequence(
+            data=data,
+            frame_times=np.arange(num_frames, dtype=np.float32)
+            / max(video_clip.fps, 1e-3),
+            fps=fine_seq.fps,
+            interpolation_mask=np.zeros((num_frames, 33), dtype=bool),
+            valid_mask=valid_mask,
+        )
+        return pose_sequence, start
 
-            with torch.no_grad():
-                coral_logits, cls_logits = ai_model(joint_tensor, global_tensor)
+    def _compute_metrics(self, sliced_seq):
+        """Swing speed and arm angle, calculated on non-resampled data."""
+        swing_speed_val = 0.0
+        arm_angle_val = 0.0
+        try:
+            pose_processor = self.pose_processor
+            metrics_data, _ = pose_processor._interpolate(sliced_seq.data)
+            metrics_data = pose_processor._smooth(metrics_data)
+            metrics_data = pose_processor._spatial_normalize(metrics_data)
+
+            metrics_seq = PoseSequence(
+                data=metrics_data,
+                frame_times=sliced_seq.frame_times,
+                fps=sliced_seq.fps,
+                interpolation_mask=sliced_seq.interpolation_mask,
+                valid_mask=sliced_seq.valid_mask,
+            )
 
-                probs = torch.softmax(cls_logits, dim=1)
-                pred_idx = torch.argmax(probs, dim=1).item()
+            m_joint_feats, m_global_feats = self.feature_engineer.compute_features(
+                metrics_seq
+            )
 
-                predicted_band = config.ID_TO_BAND.get(pred_idx, "Unknown")
-                probs_str = str(probs.numpy()[0])
+            # Swing Speed: Hip Widths/s -> m/s (Approx 1 HW = 0.35m)
+            raw_speed = np.percentile(m_global_feats[:, 2], 95)
+            swing_speed_val = float(raw_speed * 0.35)
 
-                print(f"AI Result: Band {predicted_band}")
+            # Arm Angle
+            arm_angle_val = float(np.max(m_joint_feats[:, 13, 12]))
 
-        except Exception as e:
-            print(f"AI Prediction Error: {e}")
-            traceback.print_exc()
-
-    # 5. Draw Overlay & Export
-    print("Generating output video...")
-    h, w, _ = video_clip.frames[0].shape
-    temp_output = output_path + ".temp.mp4"
+            print(
+                f"Metrics: Speed={swing_speed_val:.2f} m/s, Angle={arm_angle_val:.1f}"
+            )
 
-    out = cv2.VideoWriter(
-        temp_output, cv2.VideoWriter_fourcc(*"mp4v"), video_clip.fps, (w, h)
-    )
+        except Exception as e:
+            print(f"Error calculating metrics: {e}")
 
-    phase_detector = GolfPhaseDetector()
+        return swing_speed_val, arm_angle_val
 
-    for i, frame in enumerate(video_clip.frames):
-        landmarks = pose_sequence.data[i]
+    def _predict(self, sliced_seq):
+        joint_feats, global_feats = self._model_inputs(sliced_seq)
 
-        if pose_sequence.valid_mask[i]:
-            annotated_frame = draw_landmarks_from_array(frame, landmarks)
-            current_phase = phase_detector.update(landmarks)
+        # Inference
+        if self.batcher is not None:
+            probs = self.batcher.submit(joint_feats, global_feats).result()
         else:
-            annotated_frame = frame
-            current_phase = phase_detector.phase
-
-        cv2.putText(
-            annotated_frame,
-            f"Phase: {current_phase}",
-            (50, 100),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            1.5,
-            (0, 0, 255),
-            3,
-            cv2.LINE_AA,
+            probs = self.backend.predict_proba(joint_feats[None], global_feats[None])[0]
+        return self._band_from_probs(probs)
+
+    def _predict_batch(self, sliced_seqs):
+        """[(band, probs_str)] for several sequences in one model call."""
+        inputs = [self._model_inputs(sliced_seq) for sliced_seq in sliced_seqs]
+        if self.batcher is not None:
+            # Queued together, so the batcher runs them as one batch.
+            futures = [self.batcher.submit(joint, global_) for joint, global_ in inputs]
+            all_probs = [future.result() for future in futures]
+        else:
+            all_probs = self.backend.predict_proba(
+                np.stack([joint for joint, _ in inputs]),
+                np.stack([global_ for _, global_ in inputs]),
+            )
+        return [self._band_from_probs(probs) for probs in all_probs]
+
+    def _model_inputs(self, sliced_seq):
+        """Model input for one sequence: joint (T, J*D), global (T, 3)."""
+        # Prepare for AI (Normalize & Resample)
+        processed_seq, _ = self.pose_processor.prepare_sequence(sliced_seq)
+        joint_feats, global_feats = self.feature_engineer.compute_features(
+            processed_seq
         )
 
-        if predicted_band != "Unknown":
+        if not self.backend.scaler_fused:
+            scaler = None
+            try:
+                scaler = load_scaler()
+            except Exception as e:
+                print(f"Scaler error: {e}")
+            if scaler is not None:
+                joint_feats, global_feats = scaler.transform(joint_feats, global_feats)
+
+        T, J, D = joint_feats.shape
+        return joint_feats.reshape(T, J * D), global_feats
+
+    @staticmethod
+    def _band_from_probs(probs):
+        pred_idx = int(np.argmax(probs))
+        predicted_band = config.ID_TO_BAND.get(pred_idx, "Unknown")
+        return predicted_band, str(probs)
+
+    def _render(
+        self, video_clip, pose_sequence, predicted_band, output_path, frame_labels=None
+    ):
+        """frame_labels optionally replaces the band text per frame (None: no
+        text on that frame)."""
+        # Phases depend on every earlier frame, so they are tracked up front;
+        # drawing a frame then only needs its own index.
+        phase_detector = GolfPhaseDetector()
+        phases = []
+        for landmarks, valid in zip(pose_sequence.data, pose_sequence.valid_mask):
+            if valid:
+                phase_detector.update(landmarks)
+            phases.append(phase_detector.phase)
+
+        # Frames are drawn on in place: each decoded frame is used only once.
+        renderer = OverlayRenderer(pose_sequence.data)
+
+        def annotate(numbered_frame):
+            i, annotated_frame = numbered_frame
+            # A re-decode can yield frames the pose pass never saw; draw no
+            # skeleton on those.
+            if i < len(pose_sequence.data) and pose_sequence.valid_mask[i]:
+                renderer.draw(annotated_frame, i)
+            current_phase = phases[i] if i < len(phases) else phase_detector.phase
+
             cv2.putText(
                 annotated_frame,
-                f"Band: {predicted_band}",
-                (50, 150),
+                f"Phase: {current_phase}",
+                (50, 100),
                 cv2.FONT_HERSHEY_SIMPLEX,
-                1.0,
-                (255, 0, 0),
-                2,
+                1.5,
+                (0, 0, 255),
+                3,
                 cv2.LINE_AA,
             )
 
-        out.write(annotated_frame)
-
-    out.release()
-    pose_processor.reset()
+            if frame_labels is not None:
+                label = frame_labels[i] if i < len(frame_labels) else None
+            elif predicted_band != "Unknown":
+                label = f"Band: {predicted_band}"
+            else:
+                label = None
+            if label is not None:
+                cv2.putText(
+                    annotated_frame,
+                    label,
+                    (50, 150),
+                    cv2.FONT_HERSHEY_SIMPLEX,
+                    1.0,
+                    (255, 0, 0),
+                    2,
+                    cv2.LINE_AA,
+                )
+            return annotated_frame
+
+        # Streaming clips are decoded a second time here instead of being kept
+        # in memory since pose extraction. Pipelined: decode -> overlay ->
+        # writer (this thread) run concurrently.
+        numbered_frames = enumerate(video_clip.iter_frames())
+        if config.PIPELINED_EXECUTION:
+            annotated_frames = iter_stages(numbered_frames, [annotate])
+        else:
+            annotated_frames = map(annotate, numbered_frames)
 
-    # 6. Convert to Web Format
-    print("Optimizing video for web...")
+        # Frames go straight into one libx264 encoder (no temp file and no
+        # second encode); mp4v via cv2 only when ffmpeg is unavailable.
+        print("Encoding output video...")
+        out = None
+        try:
+            for annotated_frame in annotated_frames:
+                if out is None:
+                    h, w, _ = annotated_frame.shape
+                    out = create_encoder(output_path, video_clip.fps, w, h)
+                out.write(annotated_frame)
+        except BaseException:
+            if out is not None:
+                out.abort()
+            raise
+        if out is not None:
+            out.close()
+
+
+def process_video(input_path, output_path, mode="analyze", landmarks_path=None):
+    """One-shot CLI job. mode: "analyze", "metrics" (defer the overlay video),
+    "render" (overlay video for an earlier metrics-only run), "landmarks"
+    (client landmark track only, no video) or "swings" (every swing of a long
+    recording; each swing is printed as soon as it is scored)."""
+    if mode == "render":
+        # Rendering needs neither the model nor the scaler.
+        analyzer = SwingAnalyzer(load_model=False)
+    else:
+        analyzer = SwingAnalyzer()
     try:
-        subprocess.run(
-            [
-                "ffmpeg",
-                "-y",
-                "-i",
-                temp_output,
-                "-vcodec",
-                "libx264",
-                "-pix_fmt",
-                "yuv420p",
-                "-preset",
-                "fast",
-                output_path,
-            ],
-            check=True,
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
+        result = run_job(
+            analyzer,
+            input_path,
+            output_path,
+            mode,
+            landmarks_path,
+            on_swing=lambda swing: print(
+                f"__SWING_START__{json.dumps(swing)}__SWING_END__", flush=True
+            ),
+        )
+    except Exception as e:
+        print(f"Error processing video: {e}")
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        analyzer.close()
+
+    print(f"__JSON_START__{json.dumps(result)}__JSON_END__")
+
+
+def run_job(
+    analyzer,
+    input_path,
+    output_path,
+    mode="analyze",
+    landmarks_path=None,
+    on_swing=None,
+):
+    if mode == "analyze":
+        return analyzer.analyze(input_path, output_path, landmarks_path=landmarks_path)
+    if mode == "metrics":
+        return analyzer.analyze(
+            input_path, output_path, render=False, landmarks_path=landmarks_path
+        )
+    if mode == "render":
+        return analyzer.render(input_path, output_path)
+    if mode == "landmarks":
+        if landmarks_path is None:
+            raise ValueError("Job mode 'landmarks' needs a landmark track")
+        return analyzer.analyze_landmarks(landmarks_path)
+    if mode == "swings":
+        return analyzer.analyze_swings(
+            input_path, output_path, on_swing=on_swing, landmarks_path=landmarks_path
         )
+    raise ValueError(
+        f"Unknown job mode: {mode}. "
+        "Valid: ['analyze', 'metrics', 'render', 'landmarks', 'swings']"
+    )
 
-        if os.path.exists(temp_output):
-            os.remove(temp_output)
 
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        print("FFmpeg failed or not found, using original output.")
-        if os.path.exists(temp_output):
-            os.rename(temp_output, output_path)
+def run_worker():
+    """Serve analysis jobs over stdin/stdout, one JSON object per line.
 
-    print(f"Done! Saved to: {output_path}")
+    Request:  {"id": "...", "input": "<video path>", "output": "<video path>",
+               "mode": "analyze" | "metrics" | "render" | "landmarks" | "swings",
+               "landmarks": "<client landmark track path>"}
+              mode is optional; landmarks replaces pose extraction, and with
+              mode "landmarks" input/output are omitted (no video). Mode
+              "swings" takes an optional output (overlay video).
+    Response: {"id": "...", "ok": true, "result": {...}}
+              {"id": "...", "ok": false, "error": "..."}
+    Event:    {"id": "...", "event": "swing", "swing": {...}}
+              mode "swings" only: one per swing, before the response.
 
-    result = {
-        "band": predicted_band,
-        "probs": probs_str,
-        "swing_start": swing_window.start_frame,
-        "swing_end": swing_window.end_frame,
-        "swing_speed": swing_speed_val,
-        "arm_angle": arm_angle_val,
-    }
-    print(f"__JSON_START__{json.dumps(result)}__JSON_END__")
+    Up to WORKER_CONCURRENCY jobs run at once and responses may arrive out of
+    order. Stdout is reserved for the protocol: progress logs (including
+    anything native libraries write to fd 1) are redirected to stderr.
+    """
+    protocol_out = os.fdopen(os.dup(sys.stdout.fileno()), "w", buffering=1)
+    sys.stdout.flush()
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+
+    reply_lock = threading.Lock()
+
+    def reply(message):
+        with reply_lock:
+            protocol_out.write(json.dumps(message) + "\n")
+            protocol_out.flush()
+
+    analyzer = SwingAnalyzer(batching=True)
+    reply({"event": "ready"})
+
+    def handle(job_id, job):
+        try:
+            result = run_job(
+                analyzer,
+                job.get("input"),
+                job.get("output"),
+                job.get("mode", "analyze"),
+                job.get("landmarks"),
+                on_swing=lambda swing: reply(
+                    {"id": job_id, "event": "swing", "swing": swing}
+                ),
+            )
+            reply({"id": job_id, "ok": True, "result": result})
+        except Exception as e:
+            traceback.print_exc()
+            reply({"id": job_id, "ok": False, "error": str(e)})
+
+    # Each job thread builds its own landmarker once, when the thread starts.
+    executor = ThreadPoolExecutor(
+        max_workers=config.WORKER_CONCURRENCY, initializer=analyzer.warm_up
+    )
+    try:
+        for line in sys.stdin:
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                reply({"id": None, "ok": False, "error": f"Bad request: {e}"})
+                continue
+            executor.submit(handle, job.get("id"), job)
+    finally:
+        executor.shutdown(wait=True)
+        analyzer.close()
 
 
 if __name__ == "__main__":
-    if len(sys.argv) < 3:
-        print("Usage: python process_video.py <input> <output>")
-        sys.exit(1)
+    if len(sys.argv) >= 2 and sys.argv[1] == "--worker":
+        run_worker()
+        sys.exit(0)
+
+    args = sys.argv[1:]
+    mode = "analyze"
+    landmarks_path = None
+    if len(args) >= 2 and args[0] == "--landmarks":
+        args.pop(0)
+        landmarks_path = args.pop(0)
+        if not args:
+            mode = "landmarks"
+    if args and args[0] in ("--metrics-only", "--render", "--swings"):
+        mode = {"--metrics-only": "metrics", "--render": "render"}.get(
+            args.pop(0), "swings"
+        )
 
-    process_video(sys.argv[1], sys.argv[2])
+    if mode == "landmarks":
+        process_video(None, None, mode, landmarks_path)
+    elif mode == "swings" and len(args) in (1, 2):
+        # Overlay video only when an output path is given.
+        output_path = args[1] if len(args) == 2 else None
+        process_video(args[0], output_path, mode, landmarks_path)
+    elif mode != "swings" and len(args) >= 2:
+        process_video(args[0], args[1], mode, landmarks_path)
+    else:
+        print(
+            "Usage: python process_video.py [--landmarks <track>] "
+            "[--metrics-only | --render] <input> <output>"
+        )
+        print(
+            "       python process_video.py [--landmarks <track>] "
+            "--swings <input> [<output>]"
+        )
+        print("       python process_video.py --landmarks <track>")
+        print("       python process_video.py --worker")
+        sys.exit(1)
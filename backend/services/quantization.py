@@ -0,0 +1,149 @@
+"""Int8 dynamic quantization of GolfSwingModel for CPU inference.
+
+Usage (agreement check against the float model on stored sequences; DIR is
+a FeatureStore or a folder of .npz samples):
+    python -m services.quantization [--checkpoint PATH] [--sequences DIR]
+                                    [--limit N] [--scaler-version V]
+
+Stored features are raw; unless the checkpoint has the scaler fused in, they
+are normalised with the current scaler (or --scaler-version) while loading.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import torch
+from torch.ao.quantization import default_dynamic_qconfig, quantize_dynamic
+
+import services.config as config
+from services.feature_engineering import FeatureScaler, load_scaler
+from services.feature_store import FeatureStore, default_store_root
+from services.inference_backend import TorchBackend
+from services.model_utils import is_scaler_fused, load_model
+
+# Layers converted to int8: the joint projection, the BiLSTM, the attention
+# MLP and the fusion layer. The small global/gate MLPs and the heads stay float.
+QUANTIZED_MODULES: Tuple[str, ...] = (
+    "joint_fc.0",
+    "lstm",
+    "attn.0",
+    "attn.3",
+    "fused_fc.0",
+)
+
+
+def quantize_model(model: torch.nn.Module) -> torch.nn.Module:
+    """Return an int8 dynamically-quantized copy of an eager GolfSwingModel."""
+    qconfig_spec = {name: default_dynamic_qconfig for name in QUANTIZED_MODULES}
+    quantized = quantize_dynamic(model, qconfig_spec, dtype=torch.qint8)
+    quantized.eval()
+    return quantized
+
+
+def load_quantized_model(model_path=config.AI_MODEL_PATH) -> torch.nn.Module:
+    return quantize_model(load_model(model_path))
+
+
+def compare_models(
+    float_model: torch.nn.Module,
+    quant_model: torch.nn.Module,
+    sequences_dir: Path,
+    limit: Optional[int] = None,
+    scaler: Optional[FeatureScaler] = None,
+    batch_size: int = 32,
+) -> Dict[str, float]:
+    """Band agreement and probability drift of quant_model vs float_model.
+
+    sequences_dir holds saved samples (X_joint (T,33,13), X_global (T,3)):
+    a FeatureStore or a folder of .npz files. Stored features are raw: pass
+    the FeatureScaler the model expects unless its scaler is fused in.
+    """
+    float_backend = TorchBackend(float_model)
+    quant_backend = TorchBackend(quant_model)
+    if FeatureStore.exists(sequences_dir):
+        store = FeatureStore(sequences_dir)
+        samples = [
+            (lambda entry=entry: store.load(entry)) for entry in store.records()
+        ]
+    else:
+        samples = [
+            (lambda path=path: np.load(path, allow_pickle=True))
+            for path in sorted(Path(sequences_dir).glob("*.npz"))
+        ]
+    if limit is not None:
+        samples = samples[:limit]
+
+    float_probs, quant_probs = [], []
+    for i in range(0, len(samples), batch_size):
+        joints, globals_ = [], []
+        for load_sample in samples[i : i + batch_size]:
+            data = load_sample()
+            X_joint = np.asarray(data["X_joint"], dtype=np.float32)
+            X_global = np.asarray(data["X_global"], dtype=np.float32)
+            if scaler is not None:
+                X_joint, X_global = scaler.transform(X_joint, X_global)
+            T, J, D = X_joint.shape
+            joints.append(X_joint.reshape(T, J * D))
+            globals_.append(X_global)
+
+        joint_batch = np.stack(joints)
+        global_batch = np.stack(globals_)
+        float_probs.append(float_backend.predict_proba(joint_batch, global_batch))
+        quant_probs.append(quant_backend.predict_proba(joint_batch, global_batch))
+
+    if not samples:
+        return {"samples": 0}
+
+    float_probs = np.concatenate(float_probs)
+    quant_probs = np.concatenate(quant_probs)
+    drift = np.abs(float_probs - quant_probs)
+    return {
+        "samples": int(len(samples)),
+        "band_agreement": float(
+            np.mean(np.argmax(float_probs, 1) == np.argmax(quant_probs, 1))
+        ),
+        "max_prob_drift": float(np.max(drift)),
+        "mean_prob_drift": float(np.mean(drift)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--checkpoint", default=str(config.AI_MODEL_PATH))
+    parser.add_argument(
+        "--sequences",
+        default=str(
+            default_store_root()
+            if config.FEATURE_STORAGE == "store"
+            else config.OUTPUT_ROOT / config.FINAL_SEQUENCE_SUBDIR
+        ),
+    )
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument(
+        "--scaler-version",
+        default=None,
+        help="scaler the checkpoint was trained with (default: current)",
+    )
+    args = parser.parse_args()
+
+    scaler = None
+    if not is_scaler_fused(args.checkpoint):
+        scaler = load_scaler(version=args.scaler_version)
+        if scaler is None:
+            raise SystemExit("No feature scaler found; run the dataset build first")
+
+    float_model = load_model(args.checkpoint)
+    quant_model = quantize_model(float_model)
+    report = compare_models(
+        float_model, quant_model, Path(args.sequences), args.limit, scaler
+    )
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
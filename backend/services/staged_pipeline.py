@@ -0,0 +1,134 @@
+"""Thread-per-stage execution for the per-frame parts of the analysis.
+
+The source iterator (usually a video decoder) and every stage run on their
+own thread, connected by bounded queues, so decoding, pose estimation,
+drawing and encoding overlap instead of running one after another. Items keep
+their order: each stage is a single thread.
+
+Decoding (cv2 / ffmpeg pipes), MediaPipe inference and cv2 drawing release the
+GIL, so the stages really do run in parallel.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, List, Sequence
+
+import services.config as config
+
+_DONE = object()
+_POLL_S = 0.1
+
+
+class _Failure:
+    def __init__(self, error: BaseException) -> None:
+        self.error = error
+
+
+def _put(q: "queue.Queue", item, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=_POLL_S)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: "queue.Queue", stop: threading.Event):
+    while not stop.is_set():
+        try:
+            return q.get(timeout=_POLL_S)
+        except queue.Empty:
+            continue
+    return _DONE
+
+
+def _produce(items: Iterable, out: "queue.Queue", stop: threading.Event) -> None:
+    iterator = iter(items)
+    try:
+        for item in iterator:
+            if not _put(out, item, stop):
+                return
+        _put(out, _DONE, stop)
+    except BaseException as e:
+        _put(out, _Failure(e), stop)
+    finally:
+        # Release the decoder on this thread, even when the consumer gave up.
+        close = getattr(iterator, "close", None)
+        if close is not None:
+            close()
+
+
+def _work(
+    fn: Callable, inp: "queue.Queue", out: "queue.Queue", stop: threading.Event
+) -> None:
+    while True:
+        item = _get(inp, stop)
+        if item is _DONE or isinstance(item, _Failure):
+            _put(out, item, stop)
+            return
+        try:
+            result = fn(item)
+        except BaseException as e:
+            _put(out, _Failure(e), stop)
+            return
+        if not _put(out, result, stop):
+            return
+
+
+def iter_stages(
+    items: Iterable,
+    stages: Sequence[Callable] = (),
+    queue_size: int = config.PIPELINE_QUEUE_SIZE,
+) -> Iterator:
+    """Yield stages[-1](...stages[0](item)) for each item, in order.
+
+    The source and each stage run on a background thread; the caller's loop is
+    the last stage. An exception in any thread is re-raised to the caller, and
+    abandoning the iterator stops all threads.
+    """
+    stop = threading.Event()
+    queues: List["queue.Queue"] = [
+        queue.Queue(maxsize=max(1, queue_size)) for _ in range(len(stages) + 1)
+    ]
+    threads = [
+        threading.Thread(
+            target=_produce,
+            args=(items, queues[0], stop),
+            name="pipeline-source",
+            daemon=True,
+        )
+    ]
+    for i, fn in enumerate(stages):
+        threads.append(
+            threading.Thread(
+                target=_work,
+                args=(fn, queues[i], queues[i + 1], stop),
+                name=f"pipeline-stage-{i}",
+                daemon=True,
+            )
+        )
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = _get(queues[-1], stop)
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+
+def prefetch(
+    items: Iterable, queue_size: int = config.PIPELINE_QUEUE_SIZE
+) -> Iterator:
+    """Produce items on a background thread, up to queue_size ahead."""
+    return iter_stages(items, (), queue_size)
@@ -0,0 +1,347 @@
+"""Video decoder and encoder backends.
+
+Both decoders yield BGR frames resampled to a target fps on the same timeline:
+output frame n is the first source frame whose timestamp is >= n / target_fps.
+
+- OpenCVDecoder: cv2.VideoCapture; frames between sample points are grab()bed
+  but never retrieve()d, so they are demuxed/decoded without colour conversion.
+- FFmpegDecoder: pipes raw bgr24 frames from an ffmpeg process that does the
+  resampling (select filter) and downscaling (scale filter) natively. If
+  ffmpeg fails before producing a frame, the video is decoded with OpenCV.
+
+Encoders take BGR frames and write the web-ready output video:
+
+- FFmpegEncoder: pipes raw bgr24 frames into a single ffmpeg libx264/yuv420p
+  process, so the output is encoded exactly once.
+- OpenCVEncoder: cv2.VideoWriter (mp4v); only used when ffmpeg is missing.
+"""
+
+from __future__ import annotations
+
+import functools
+import shutil
+import subprocess
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+import cv2
+import numpy as np
+
+import services.config as config
+
+
+def resize_long_side(
+    frame: np.ndarray, long_side: Optional[int], dst: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """Downscale so max(h, w) <= long_side (never upscales).
+
+    Bilinear, like the landmarker's own input resize; INTER_AREA costs more
+    than the colour conversion it is meant to save on 4K frames.
+    dst is an optional preallocated output buffer of the target shape.
+    """
+    h, w = frame.shape[:2]
+    if not long_side or max(h, w) <= long_side:
+        return frame
+    size = scaled_size(w, h, long_side)
+    if dst is not None and dst.shape[:2] != (size[1], size[0]):
+        dst = None
+    return cv2.resize(frame, size, dst=dst, interpolation=cv2.INTER_LINEAR)
+
+
+def scaled_size(width: int, height: int, long_side: Optional[int]) -> Tuple[int, int]:
+    if not long_side or max(width, height) <= long_side:
+        return width, height
+    scale = long_side / max(width, height)
+    return max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+
+
+@dataclass
+class VideoInfo:
+    fps: float  # source fps
+    width: int  # displayed width (after rotation metadata is applied)
+    height: int
+
+
+def probe_video(video_path: Path, default_fps: float = config.TARGET_FPS) -> VideoInfo:
+    cap = cv2.VideoCapture(str(video_path))
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open video: {video_path}")
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or float(default_fps)
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        # Phone footage is often stored rotated; both decoders apply the
+        # rotation, so report the displayed size.
+        rotation = int(cap.get(cv2.CAP_PROP_ORIENTATION_META) or 0) % 180
+        if rotation == 90:
+            width, height = height, width
+    finally:
+        cap.release()
+    return VideoInfo(fps=float(fps), width=width, height=height)
+
+
+class OpenCVDecoder:
+    name = "opencv"
+
+    def iter_frames(
+        self, video_path: Path, target_fps: float, long_side: Optional[int] = None
+    ) -> Iterator[np.ndarray]:
+        cap = cv2.VideoCapture(str(video_path))
+        if not cap.isOpened():
+            raise RuntimeError(f"Cannot open video: {video_path}")
+
+        orig_fps = cap.get(cv2.CAP_PROP_FPS) or float(target_fps)
+        orig_dt = 1.0 / max(
+            orig_fps, 1e-3
+        )  # Thời gian giữa 2 frame gốc (Delta Time gốc)
+        target_dt = 1.0 / target_fps  # Thời gian giữa 2 frame mục tiêu (Delta Time đích)
+
+        next_sample_time = 0.0
+        timestamp = 0.0
+
+        # Lấy mẫu lại: chỉ giải mã đầy đủ (retrieve) frame tại thời điểm mẫu,
+        # các frame ở giữa chỉ grab() rồi bỏ qua.
+        try:
+            while cap.grab():
+                if timestamp + 1e-6 >= next_sample_time:
+                    ret, frame = cap.retrieve()
+                    if not ret:
+                        break
+                    yield resize_long_side(frame, long_side)
+                    next_sample_time += target_dt
+                timestamp += orig_dt
+        finally:
+            cap.release()
+
+
+class FFmpegDecoder:
+    name = "ffmpeg"
+
+    def __init__(
+        self,
+        binary: str = config.FFMPEG_BINARY,
+        threads: int = config.FFMPEG_DECODE_THREADS,
+    ) -> None:
+        self.binary = binary
+        self.threads = threads
+
+    @staticmethod
+    def available(binary: str = config.FFMPEG_BINARY) -> bool:
+        return shutil.which(binary) is not None
+
+    def iter_frames(
+        self, video_path: Path, target_fps: float, long_side: Optional[int] = None
+    ) -> Iterator[np.ndarray]:
+        info = probe_video(video_path, target_fps)
+        width, height = scaled_size(info.width, info.height, long_side)
+
+        # Same sample selection as OpenCVDecoder: keep source frame n when
+        # n * orig_dt has reached the next target sample time. (The fps filter
+        # would pick the last frame *before* each tick and duplicate frames
+        # of slower sources, which shifts the timeline.) Dropped frames are
+        # never colour-converted or scaled.
+        orig_dt = 1.0 / max(info.fps, 1e-3)
+        target_dt = 1.0 / target_fps
+        filters = [f"select='gte(n*{orig_dt!r}+1e-6,selected_n*{target_dt!r})'"]
+        if (width, height) != (info.width, info.height):
+            filters.append(f"scale={width}:{height}:flags=bilinear")
+
+        cmd = [
+            self.binary,
+            "-v",
+            "error",
+            "-nostdin",
+            # A fixed thread count keeps decode throughput (and CPU share per
+            # worker) independent of the core count of the box.
+            "-threads",
+            str(self.threads),
+            "-i",
+            str(video_path),
+            "-an",
+            "-sn",
+            "-vf",
+            ",".join(filters),
+            # -vsync rather than -fps_mode (ffmpeg >= 5.1 only); newer
+            # versions still accept it.
+            "-vsync",
+            "passthrough",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "bgr24",
+            "pipe:1",
+        ]
+        # stderr goes to a file: a pipe nobody reads could fill up and block.
+        stderr = tempfile.TemporaryFile()
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr, bufsize=0)
+        frame_bytes = width * height * 3
+        num_frames = 0
+        try:
+            while True:
+                buf = bytearray(frame_bytes)
+                view = memoryview(buf)
+                filled = 0
+                while filled < frame_bytes:
+                    n = proc.stdout.readinto(view[filled:])
+                    if not n:
+                        break
+                    filled += n
+                if filled < frame_bytes:
+                    break
+                yield np.frombuffer(buf, dtype=np.uint8).reshape(height, width, 3)
+                num_frames += 1
+
+            if proc.wait() != 0:
+                stderr.seek(0)
+                error = stderr.read().decode(errors="replace").strip()
+                if num_frames > 0:
+                    raise RuntimeError(f"ffmpeg decode failed: {error}")
+                print(f"ffmpeg decode failed ({error}), using the OpenCV decoder.")
+                fallback = OpenCVDecoder()
+                yield from fallback.iter_frames(video_path, target_fps, long_side)
+        finally:
+            proc.stdout.close()
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+            stderr.close()
+
+
+def create_decoder(name: str = config.VIDEO_DECODER):
+    if name == "ffmpeg":
+        if FFmpegDecoder.available():
+            return FFmpegDecoder()
+        print("ffmpeg not found, falling back to the OpenCV decoder.")
+        return OpenCVDecoder()
+    if name == "opencv":
+        return OpenCVDecoder()
+    raise ValueError(f"Unknown video decoder: {name}. Valid: ['opencv', 'ffmpeg']")
+
+
+class FFmpegEncoder:
+    name = "ffmpeg"
+
+    def __init__(
+        self,
+        output_path,
+        fps: float,
+        width: int,
+        height: int,
+        binary: str = config.FFMPEG_BINARY,
+    ) -> None:
+        self.output_path = str(output_path)
+        self.frame_shape = (height, width, 3)
+        cmd = [
+            binary,
+            "-v",
+            "error",
+            "-nostdin",
+            "-y",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "bgr24",
+            "-s",
+            f"{width}x{height}",
+            "-r",
+            str(fps),
+            "-i",
+            "pipe:0",
+            "-an",
+            "-vcodec",
+            "libx264",
+            "-pix_fmt",
+            "yuv420p",
+            "-preset",
+            "fast",
+            self.output_path,
+        ]
+        # stderr goes to a file: a pipe nobody reads while encoding could
+        # fill up and block ffmpeg (and this process on the next write).
+        self.stderr = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.DEVNULL,
+            stderr=self.stderr,
+        )
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def available(binary: str = config.FFMPEG_BINARY) -> bool:
+        if shutil.which(binary) is None:
+            return False
+        try:
+            encoders = subprocess.run(
+                [binary, "-hide_banner", "-encoders"],
+                capture_output=True,
+                text=True,
+                check=True,
+            ).stdout
+        except (subprocess.CalledProcessError, OSError):
+            return False
+        return "libx264" in encoders
+
+    def write(self, frame: np.ndarray) -> None:
+        if frame.shape != self.frame_shape:
+            raise ValueError(
+                f"Frame shape {frame.shape} does not match encoder {self.frame_shape}"
+            )
+        try:
+            self.proc.stdin.write(np.ascontiguousarray(frame).data)
+        except BrokenPipeError:
+            self.proc.wait()
+            raise RuntimeError(f"ffmpeg encoder exited: {self._stderr()}") from None
+
+    def close(self) -> None:
+        self.proc.stdin.close()
+        try:
+            if self.proc.wait() != 0:
+                raise RuntimeError(f"ffmpeg encoder failed: {self._stderr()}")
+        finally:
+            self.stderr.close()
+
+    def abort(self) -> None:
+        """Stop encoding and remove the partial output."""
+        self.proc.kill()
+        try:
+            self.proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        self.proc.wait()
+        self.stderr.close()
+        Path(self.output_path).unlink(missing_ok=True)
+
+    def _stderr(self) -> str:
+        self.stderr.seek(0)
+        return self.stderr.read().decode(errors="replace").strip()
+
+
+class OpenCVEncoder:
+    name = "opencv"
+
+    def __init__(self, output_path, fps: float, width: int, height: int) -> None:
+        self.output_path = str(output_path)
+        self.writer = cv2.VideoWriter(
+            self.output_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height)
+        )
+
+    def write(self, frame: np.ndarray) -> None:
+        self.writer.write(frame)
+
+    def close(self) -> None:
+        self.writer.release()
+
+    def abort(self) -> None:
+        self.writer.release()
+        Path(self.output_path).unlink(missing_ok=True)
+
+
+def create_encoder(output_path, fps: float, width: int, height: int):
+    # yuv420p needs even dimensions; such videos always got the mp4v file.
+    if width % 2 == 0 and height % 2 == 0 and FFmpegEncoder.available():
+        return FFmpegEncoder(output_path, fps, width, height)
+    print("FFmpeg (libx264) not usable for this video, writing mp4v output.")
+    return OpenCVEncoder(output_path, fps, width, height)
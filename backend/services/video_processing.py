@@ -4,24 +4,48 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List
+from typing import Callable, Iterator, List, Optional, Tuple
 
-import cv2
 import numpy as np
 
 import services.config as config
 from pipeline.types import PoseSequence, SwingWindow
+from services.video_io import create_decoder, probe_video
 
 
 @dataclass
 class VideoClip:
-    frames: List[np.ndarray]  # Danh sách các frame ảnh (BGR)
+    frames: Optional[List[np.ndarray]]  # Danh sách các frame ảnh (BGR); None khi streaming
     fps: float  # target fps after resampling
     original_fps: float  # source fps
+    # Streaming clips keep no frames in memory: `source` re-decodes the video
+    # lazily every time the frames are iterated.
+    source: Optional[Callable[[], Iterator[np.ndarray]]] = None
+    num_frames: int = 0  # streaming: known after the first full pass
+
+    def __post_init__(self) -> None:
+        if self.frames is not None:
+            self.num_frames = len(self.frames)
+
+    @property
+    def is_streaming(self) -> bool:
+        return self.frames is None
+
+    def iter_frames(self) -> Iterator[np.ndarray]:
+        if self.frames is not None:
+            return iter(self.frames)
+        return self._counting(self.source())
+
+    def _counting(self, frames: Iterator[np.ndarray]) -> Iterator[np.ndarray]:
+        count = 0
+        for frame in frames:
+            count += 1
+            yield frame
+        self.num_frames = count
 
     @property
     def duration(self) -> float:
-        return len(self.frames) / self.fps if self.frames else 0.0
+        return self.num_frames / self.fps if self.num_frames else 0.0
 
 
 class VideoProcessor:
@@ -34,39 +58,33 @@ class VideoProcessor:
       same timeline as the resampled video frames.
     """
 
-    def __init__(self, target_fps: int = config.TARGET_FPS) -> None:
+    def __init__(
+        self, target_fps: int = config.TARGET_FPS, decoder: Optional[str] = None
+    ) -> None:
         # Initialize VideoProcessor with target FPS and padding margin.
         self.target_fps = target_fps
         self.padding_margin = config.PADDING_MARGIN_FRAMES
+        self.decoder = create_decoder(decoder or config.VIDEO_DECODER)
+
+    def iter_resampled(
+        self,
+        video_path: Path,
+        long_side: Optional[int] = None,
+        target_fps: Optional[float] = None,
+    ) -> Iterator[np.ndarray]:
+        """Decode the video, yielding frames resampled to target_fps one by one.
+
+        With long_side, frames are downscaled right after decoding (for
+        consumers such as the landmarker that never need full resolution).
+        target_fps overrides self.target_fps (e.g. for a coarse pose pass).
+        """
+        return self.decoder.iter_frames(
+            video_path, target_fps or self.target_fps, long_side
+        )
 
     def load_and_resample(self, video_path: Path) -> VideoClip:
-        cap = cv2.VideoCapture(str(video_path))
-        if not cap.isOpened():
-            raise RuntimeError(f"Cannot open video: {video_path}")
-
-        orig_fps = cap.get(cv2.CAP_PROP_FPS) or float(self.target_fps)
-        orig_dt = 1.0 / max(
-            orig_fps, 1e-3
-        )  # Thời gian giữa 2 frame gốc (Delta Time gốc)
-        target_dt = (
-            1.0 / self.target_fps
-        )  # Thời gian giữa 2 frame mục tiêu (Delta Time đích)
-
-        next_sample_time = 0.0
-        timestamp = 0.0
-        frames: List[np.ndarray] = []
-
-        # Đọc và lấy mẫu lại các frame từ video (nó lấy khi thời gian hiện tại vượt quá thời gian mẫu tiếp theo)
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            if timestamp + 1e-6 >= next_sample_time:
-                frames.append(frame)
-                next_sample_time += target_dt
-            timestamp += orig_dt
-
-        cap.release()
+        orig_fps = self._probe(video_path)
+        frames = list(self.iter_resampled(video_path))
         if not frames:
             raise RuntimeError(f"Video has no frames after resampling: {video_path}")
 
@@ -74,13 +92,127 @@ class VideoProcessor:
             frames=frames, fps=float(self.target_fps), original_fps=float(orig_fps)
         )
 
-    def detect_swing_window(self, pose_sequence: PoseSequence) -> SwingWindow:
+    def open_stream(
+        self,
+        video_path: Path,
+        long_side: Optional[int] = None,
+        target_fps: Optional[float] = None,
+    ) -> VideoClip:
+        """Lazy VideoClip: frames are decoded on demand, peak memory is one frame.
+
+        Each pass over clip.iter_frames() decodes the file again, so pose
+        extraction and overlay rendering never hold the whole video in RAM.
+        """
+        orig_fps = self._probe(video_path)
+        fps = float(target_fps or self.target_fps)
+        return VideoClip(
+            frames=None,
+            fps=fps,
+            original_fps=orig_fps,
+            source=lambda: self.iter_resampled(video_path, long_side, fps),
+        )
+
+    def _probe(self, video_path: Path) -> float:
+        return probe_video(video_path, self.target_fps).fps
+
+    def detect_swing_window(
+        self, pose_sequence: PoseSequence, window_frames: int = config.N_FRAMES
+    ) -> SwingWindow:
         """Detect swing window using wrist speed on RAW/MINIMALLY-PROCESSED poses.
 
         Input pose_sequence should be aligned with resampled video frames, and should not be:
         - spatially normalized (hip-centered / rotated / scaled)
         - temporally resampled to N_FRAMES
+
+        Windows shorter than window_frames // 2 are extended to window_frames;
+        pass a smaller value for sequences sampled below TARGET_FPS.
+        """
+        speeds = self._wrist_speeds(pose_sequence)
+        max_speed = float(np.max(speeds))
+        if max_speed <= 0.0:
+            return self._torso_based_window(pose_sequence)
+
+        peak = int(np.argmax(speeds))
+        start, end = self._window_around_peak(
+            speeds, peak, 0.1 * max_speed, pose_sequence.fps, window_frames
+        )
+        confidence = min(1.0, max_speed)
+        return SwingWindow(
+            start_frame=start,
+            end_frame=end,
+            confidence=confidence,
+            method="wrist_velocity",
+        )
+
+    def detect_swing_windows(
+        self,
+        pose_sequence: PoseSequence,
+        window_frames: int = config.N_FRAMES,
+        min_peak_ratio: float = config.MULTI_SWING_MIN_PEAK_RATIO,
+        min_gap_s: float = config.MULTI_SWING_MIN_GAP_S,
+        min_active_frames: int = config.MULTI_SWING_MIN_ACTIVE_FRAMES,
+    ) -> List[SwingWindow]:
+        """Every swing in a long recording, as non-overlapping windows in order.
+
+        Same input contract as detect_swing_window(). Wrist-speed peaks are
+        taken greedily from the strongest down to min_peak_ratio of the
+        strongest; each gets the window detect_swing_window() would build
+        around it (so the first one found is exactly that window), clipped
+        against the windows already found. Peaks within min_gap_s of a found
+        window belong to that swing, and peaks with fewer than min_active_frames
+        frames at half their speed (tracking glitches) are skipped.
         """
+        if len(pose_sequence.data) == 0:
+            return []
+
+        speeds = self._wrist_speeds(pose_sequence)
+        max_speed = float(np.max(speeds))
+        if max_speed <= 0.0:
+            return [self._torso_based_window(pose_sequence)]
+
+        fps = pose_sequence.fps
+        gap = int(round(min_gap_s * fps))
+        remaining = speeds.copy()
+        windows: List[SwingWindow] = []
+        while True:
+            peak = int(np.argmax(remaining))
+            peak_speed = float(remaining[peak])
+            if peak_speed <= 0.0 or peak_speed < min_peak_ratio * max_speed:
+                break
+
+            start, end = self._window_around_peak(
+                speeds, peak, 0.1 * peak_speed, fps, window_frames
+            )
+            # Peaks this close to a swing are its other phases (backswing,
+            # follow-through), not swings of their own.
+            remaining[max(0, start - gap) : end + gap] = 0.0
+
+            active = int(np.count_nonzero(speeds[start:end] >= 0.5 * peak_speed))
+            if active < min_active_frames:
+                continue
+
+            for window in windows:
+                if window.end_frame <= peak:
+                    start = max(start, window.end_frame)
+                elif window.start_frame > peak:
+                    end = min(end, window.start_frame)
+            if end <= start:
+                continue
+
+            windows.append(
+                SwingWindow(
+                    start_frame=start,
+                    end_frame=end,
+                    confidence=min(1.0, peak_speed),
+                    method="wrist_velocity",
+                )
+            )
+
+        return sorted(windows, key=lambda window: window.start_frame)
+
+    @staticmethod
+    def _wrist_speeds(pose_sequence: PoseSequence) -> np.ndarray:
+        """(T,) max wrist speed per frame; 0 where the wrists are unreliable."""
         data = pose_sequence.data
         vis = data[:, :, 3]
         fps = pose_sequence.fps
@@ -106,14 +238,17 @@ class VideoProcessor:
                 0.0  # Ignore interpolated wrists to avoid synthetic speed spikes
             )
             speeds = np.maximum(speeds, diffs)
-
-        max_speed = float(np.max(speeds))
-        if max_speed <= 0.0:
-            return self._torso_based_window(pose_sequence)
-
-        low_th = 0.1 * max_speed
-        peak = int(np.argmax(speeds))
-
+        return speeds
+
+    def _window_around_peak(
+        self,
+        speeds: np.ndarray,
+        peak: int,
+        low_th: float,
+        fps: float,
+        window_frames: int,
+    ) -> Tuple[int, int]:
+        """[start, end) around a wrist-speed peak, down to low_th on both sides."""
         start = 0
         for i in range(peak, -1, -1):
             if speeds[i] < low_th:
@@ -131,16 +266,9 @@ class VideoProcessor:
         start = max(0, start - self.padding_margin)
         end = min(len(speeds), end + self.padding_margin)  # end is exclusive
 
-        if end - start < config.N_FRAMES // 2:
-            end = min(len(speeds), start + config.N_FRAMES)
-
-        confidence = min(1.0, max_speed)
-        return SwingWindow(
-            start_frame=start,
-            end_frame=end,
-            confidence=confidence,
-            method="wrist_velocity",
-        )
+        if end - start < window_frames // 2:
+            end = min(len(speeds), start + window_frames)
+        return start, end
 
     def _torso_based_window(self, pose_sequence: PoseSequence) -> SwingWindow:
         data = pose_sequence.data
@@ -191,3 +319,99 @@ class VideoProcessor:
         frames: List[np.ndarray], swing_window: SwingWindow
     ) -> List[np.ndarray]:
         return frames[swing_window.start_frame : swing_window.end_frame]
+
+
+class OnlineSwingDetector:
+    """Incremental detect_swing_window() over poses as they are extracted.
+
+    update() takes one raw pose per resampled frame and returns True once the
+    swing around the current wrist-speed peak is over: the speed has dropped
+    below 10% of the peak, the 0.5 s follow-through and the padding have
+    passed, and settle_s more seconds brought no faster peak. Frames after
+    that cannot change detect_swing_window() on the poses seen so far, so
+    decoding and pose extraction can stop there.
+
+    Peaks below min_peak_speed (waggles, setup) never stop extraction. A
+    fast non-swing motion before the swing still does, which is why the
+    early stop is opt-in (ONLINE_SWING_DETECTION).
+    """
+
+    WRIST_INDICES = (15, 16)
+
+    def __init__(
+        self,
+        fps: float,
+        window_frames: int = config.N_FRAMES,
+        padding_margin: int = config.PADDING_MARGIN_FRAMES,
+        min_peak_speed: float = config.ONLINE_SWING_MIN_PEAK_SPEED,
+        settle_s: float = config.ONLINE_SWING_SETTLE_S,
+    ) -> None:
+        self.fps = fps
+        self.window_frames = window_frames
+        self.padding_margin = padding_margin
+        self.min_peak_speed = min_peak_speed
+        self.settle_frames = int(round(settle_s * fps))
+
+        self.num_frames = 0
+        self.max_speed = 0.0
+        self.peak = -1
+        self._speeds: List[float] = []
+        self._prev_pose: Optional[np.ndarray] = None
+        self._stop_frame: Optional[int] = None  # stop once this many frames seen
+        self.finished = False
+
+    def update(self, pose: np.ndarray, valid: bool = True) -> bool:
+        """Add the next frame's (33, 4) pose; True when extraction can stop."""
+        speed = self._wrist_speed(pose)
+        self._prev_pose = pose
+        index = self.num_frames
+        self.num_frames += 1
+        self._speeds.append(speed)
+
+        if speed > self.max_speed:
+            # New peak: its end (and so the stop point) is not known yet.
+            self.max_speed = speed
+            self.peak = index
+            self._stop_frame = None
+        elif (
+            self._stop_frame is None
+            and self.peak >= 0
+            and speed < 0.1 * self.max_speed
+        ):
+            self._stop_frame = self._window_end(end=index) + self.settle_frames
+
+        self.finished = (
+            self._stop_frame is not None
+            and self.max_speed >= self.min_peak_speed
+            and self.num_frames >= self._stop_frame
+        )
+        return self.finished
+
+    def _wrist_speed(self, pose: np.ndarray) -> float:
+        # Same per-frame speed as VideoProcessor._wrist_speeds().
+        if self._prev_pose is None:
+            return 0.0
+        speed = np.float32(0.0)
+        for idx in self.WRIST_INDICES:
+            if pose[idx, 3] < config.THRESHOLDS["pose_visibility"]:
+                continue
+            diff = (pose[idx, :3] - self._prev_pose[idx, :3])[None]
+            speed = max(speed, np.linalg.norm(diff, axis=1)[0] * np.float32(self.fps))
+        return float(speed)
+
+    def _window_end(self, end: int) -> int:
+        """Exclusive end of the window detect_swing_window() builds around
+        the current peak, given the first frame after it below threshold."""
+        low_th = 0.1 * self.max_speed
+        start = 0
+        for i in range(self.peak, -1, -1):
+            if self._speeds[i] < low_th:
+                start = i
+                break
+
+        end = max(end, self.peak + int(0.5 * self.fps))
+        start = max(0, start - self.padding_margin)
+        end = end + self.padding_margin
+        if end - start < self.window_frames // 2:
+            end = start + self.window_frames
+        return end
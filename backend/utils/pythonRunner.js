@@ -3,23 +3,30 @@ require('dotenv').config();
 const path = require('path');
 const fs = require('fs');
 
-exports.runPythonScript = (scriptPath, args) => {
-  return new Promise((resolve, reject) => {
+const resolvePythonCommand = () => {
+  let pythonCommand = process.env.PYTHON_PATH || 'python3';
 
-    let pythonCommand = process.env.PYTHON_PATH || 'python3';
+  // Resolve relative paths from the project root
+  if (pythonCommand.startsWith('.')) {
+    pythonCommand = path.resolve(process.cwd(), pythonCommand);
+  }
 
-    // Resolve relative paths from the project root
-    if (pythonCommand.startsWith('.')) {
-      pythonCommand = path.resolve(process.cwd(), pythonCommand);
-    }
+  // If the configured python path doesn't exist, fallback to system python
+  if (pythonCommand && !['python', 'python3'].includes(pythonCommand) && !fs.existsSync(pythonCommand)) {
+    console.warn(`PYTHON_PATH not found at ${pythonCommand}. Falling back to 'python3'.`);
+    pythonCommand = 'python3';
+  }
 
-    // If the configured python path doesn't exist, fallback to system python
-    if (pythonCommand && !['python', 'python3'].includes(pythonCommand) && !fs.existsSync(pythonCommand)) {
-      console.warn(`PYTHON_PATH not found at ${pythonCommand}. Falling back to 'python3'.`);
-      pythonCommand = 'python3';
-    }
+  return pythonCommand;
+};
+
+exports.resolvePythonCommand = resolvePythonCommand;
+
+exports.runPythonScript = (scriptPath, args) => {
+  return new Promise((resolve, reject) => {
+
+    const pythonCommand = resolvePythonCommand();
 
-    
     // If the scriptPath is inside the backend folder, run it as a module
     // from the backend root so package imports (services.*, pipeline.*) work.
     const backendRoot = path.resolve(__dirname, '..');
@@ -0,0 +1,96 @@
+const { spawn } = require('child_process');
+const path = require('path');
+const readline = require('readline');
+const { resolvePythonCommand } = require('./pythonRunner');
+
+// Long-running `process_video --worker` process.
+// Model, scaler and pose landmarker stay loaded between uploads, so each job
+// only pays for the video itself instead of the torch/mediapipe cold start.
+const backendRoot = path.resolve(__dirname, '..');
+
+let workerProcess = null;
+let nextJobId = 1;
+const pendingJobs = new Map();
+
+const failPendingJobs = (err) => {
+  for (const { reject } of pendingJobs.values()) reject(err);
+  pendingJobs.clear();
+};
+
+const startWorker = () => {
+  const pythonCommand = resolvePythonCommand();
+  const proc = spawn(pythonCommand, ['-m', 'services.process_video', '--worker'], { cwd: backendRoot });
+
+  proc.on('error', (err) => {
+    if (workerProcess === proc) workerProcess = null;
+    failPendingJobs(new Error(`Python worker error: ${err.message}`));
+  });
+
+  proc.on('close', (code) => {
+    if (workerProcess === proc) workerProcess = null;
+    failPendingJobs(new Error(`Python worker exited (Code ${code})`));
+  });
+
+  // Writes after the worker died surface through 'close' above.
+  proc.stdin.on('error', (err) => console.error('Python worker stdin error:', err.message));
+
+  // Logs go to stderr; stdout carries one JSON message per line.
+  proc.stderr.on('data', (data) => process.stderr.write(data));
+
+  readline.createInterface({ input: proc.stdout }).on('line', (line) => {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (err) {
+      console.warn(`Ignoring non-JSON worker output: ${line}`);
+      return;
+    }
+
+    if (message.event === 'ready') {
+      console.log('Python analysis worker ready');
+      return;
+    }
+
+    const job = pendingJobs.get(message.id);
+    if (!job) return;
+
+    // Kết quả trung gian của job (vd. từng cú swing ở mode 'swings'), trước response cuối
+    if (message.event) {
+      if (job.onEvent) job.onEvent(message);
+      return;
+    }
+    pendingJobs.delete(message.id);
+
+    if (message.ok) {
+      job.resolve(message.result);
+    } else {
+      job.reject(new Error(`Python worker job failed: ${message.error}`));
+    }
+  });
+
+  return proc;
+};
+
+// onEvent (tuỳ chọn): nhận các message { event, ... } của job trước khi job xong
+exports.runWorkerJob = (payload, onEvent = null) => {
+  return new Promise((resolve, reject) => {
+    if (!workerProcess) {
+      try {
+        workerProcess = startWorker();
+      } catch (err) {
+        return reject(new Error(`Failed to spawn python worker: ${err.message}`));
+      }
+    }
+
+    const id = String(nextJobId++);
+    pendingJobs.set(id, { resolve, reject, onEvent });
+    workerProcess.stdin.write(JSON.stringify({ id, ...payload }) + '\n');
+  });
+};
+
+exports.stopWorker = () => {
+  if (workerProcess) {
+    workerProcess.stdin.end();
+    workerProcess = null;
+  }
+};